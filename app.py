@@ -1,22 +1,36 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from werkzeug.security import check_password_hash
 from config import Config
-from database.db_manager import init_database, get_user_by_username, create_admin_user
-from models.ml_model import InsurancePremiumPredictor
+from database.db_manager import init_database, get_user_by_username, get_user_by_id, create_admin_user, save_prediction_and_wait
+from models.ml_model import get_predictor, predict_cached
+from utils._numeric import warm_up
+from utils.json_provider import OrjsonProvider, orjson
+from utils.helpers import validate_prediction_inputs
 from routes.auth import auth_bp
 from routes.user import user_bp
 from routes.admin import admin_bp
-import os
+import logging
 
 
 
 
 
+# Configure logging once. Per-request details are logged at DEBUG, which stays
+# off unless LOG_LEVEL asks for it (Flask's DEBUG flag does not turn it on)
+logging.basicConfig(
+    level=Config.LOG_LEVEL.upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Serialize jsonify responses with orjson when it is installed
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # Initialize Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -32,7 +46,6 @@ login_manager.login_message_category = 'info'
 # User loader for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    from database.db_manager import get_user_by_id
     return get_user_by_id(user_id)
 
 # Register blueprints
@@ -40,9 +53,6 @@ app.register_blueprint(auth_bp, url_prefix='/auth')
 app.register_blueprint(user_bp, url_prefix='/user')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 
-# Initialize ML model
-predictor = InsurancePremiumPredictor()
-
 @app.route('/')
 def index():
     """Homepage route"""
@@ -63,11 +73,11 @@ def predict():
             region = request.form['region']
             
             # Make prediction
-            prediction = predictor.predict(age, gender, bmi, children, smoker, region)
+            prediction = predict_cached(age, gender, bmi, children, smoker, region)
             
-            # Save prediction to database
-            from database.db_manager import save_prediction
-            save_prediction(current_user.id, age, gender, bmi, children, smoker, region, prediction)
+            # Save prediction to database, committed before the dashboard reads it back
+            if save_prediction_and_wait(current_user.id, age, gender, bmi, children, smoker, region, prediction) is None:
+                flash('Your prediction could not be saved to your history.', 'warning')
             
             flash(f'Predicted Insurance Premium: ${prediction:.2f}', 'success')
             return redirect(url_for('user.dashboard'))
@@ -79,6 +89,35 @@ def predict():
     
     return render_template('predict.html')
 
+@app.route('/predict_batch', methods=['POST'])
+@login_required
+def predict_batch():
+    """Batch prediction route: JSON list of samples in, list of premiums out"""
+    samples = request.get_json(silent=True)
+    if not isinstance(samples, list) or not samples:
+        return jsonify({'error': 'Expected a non-empty JSON list of samples'}), 400
+    if len(samples) > Config.MAX_BATCH_SAMPLES:
+        return jsonify({'error': f'At most {Config.MAX_BATCH_SAMPLES} samples per batch'}), 413
+    
+    # Same range checks as the single prediction form, reported per row
+    errors = {}
+    for i, sample in enumerate(samples):
+        if not isinstance(sample, dict):
+            errors[i] = ['Sample must be a JSON object']
+            continue
+        valid, sample_errors = validate_prediction_inputs(sample)
+        if not valid:
+            errors[i] = sample_errors
+    if errors:
+        return jsonify({'error': 'Invalid sample data', 'details': errors}), 400
+    
+    try:
+        predictions = get_predictor().predict_batch(samples)
+    except (KeyError, ValueError, TypeError):
+        return jsonify({'error': 'Invalid sample data'}), 400
+    
+    return jsonify({'success': True, 'predictions': predictions})
+
 @app.errorhandler(404)
 def not_found_error(error):
     """404 error handler"""
@@ -89,19 +128,16 @@ def internal_error(error):
     """500 error handler"""
     return render_template('base.html', error_message='Internal server error'), 500
 
+# Development server only; in production run: gunicorn -c gunicorn.conf.py app:app
 if __name__ == '__main__':
     # Initialize database and create admin user
     init_database()
     create_admin_user()
     # app.run(debug=True)
     
-    # Train model if not exists
-    if not os.path.exists(Config.MODEL_PATH):
-        print("Training machine learning model...")
-        predictor.train_model()
-        print("Model training completed!")
-    else:
-        predictor.load_model()
+    # Load the model up front (trains it on first run if missing)
+    get_predictor()
+    warm_up()
     
     # Run the application
     app.run(host=Config.HOST, port=Config.PORT, debug=Config.DEBUG)
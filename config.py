@@ -15,12 +15,27 @@ class Config:
     DEBUG = True
     HOST = '0.0.0.0'
     PORT = 5000
+    # Logging level, independent of DEBUG (e.g. LOG_LEVEL=DEBUG for per-request detail)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     
     # Model Configuration
     MODEL_PATH = 'models/insurance_model.pkl'
     SCALER_PATH = 'models/scaler.pkl'
+    # Largest sample list accepted by /predict_batch
+    MAX_BATCH_SAMPLES = 1000
+    # Largest page the admin predictions view renders (use the CSV export for more)
+    MAX_PREDICTIONS_PER_PAGE = 500
     
     # Admin Configuration
     DEFAULT_ADMIN_USERNAME = 'admin1234'
     DEFAULT_ADMIN_PASSWORD = 'admin123'
     DEFAULT_ADMIN_EMAIL = 'admin@insurance.com'
+    
+    # Seconds a successful password check is remembered for repeat logins
+    LOGIN_CACHE_TTL = 300
+    
+    # Seconds a user lookup (e.g. Flask-Login's per-request load) is reused
+    USER_CACHE_TTL = 60
+    
+    # Seconds the admin analytics payload is reused between dashboard polls
+    ANALYTICS_CACHE_TTL = 30
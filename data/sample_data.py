@@ -4,11 +4,18 @@ Sample Data Generator for Medical Insurance Premium Prediction
 This script generates realistic synthetic data for training the ML model.
 """
 
+import os
+import sys
 import pandas as pd
 import numpy as np
 import random
 from datetime import datetime, timedelta
 
+# Allow running as `python data/sample_data.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models._premium_kernel import REGIONS, compute_premium
+
 def generate_insurance_data(n_samples=1000, random_seed=42):
     """
     Generate synthetic insurance data for training the ML model.
@@ -25,89 +32,52 @@ def generate_insurance_data(n_samples=1000, random_seed=42):
     
     print(f"Generating {n_samples} synthetic insurance records...")
     
-    # Define realistic ranges and distributions
-    data = []
-    
-    for i in range(n_samples):
-        # Age: Normal distribution around 40, clipped to 18-64
-        age = int(np.clip(np.random.normal(40, 12), 18, 64))
-        
-        # Gender: Roughly equal distribution
-        gender = np.random.choice(['male', 'female'], p=[0.51, 0.49])
-        
-        # BMI: Normal distribution around 28, clipped to realistic range
-        bmi = np.clip(np.random.normal(28, 6), 15, 50)
-        
-        # Children: Poisson distribution (most people have 0-2 children)
-        children = np.clip(np.random.poisson(1), 0, 5)
-        
-        # Smoker: 20% smoking rate (realistic for developed countries)
-        smoker = np.random.choice(['yes', 'no'], p=[0.2, 0.8])
-        
-        # Region: Equal distribution across regions
-        region = np.random.choice(['northeast', 'southeast', 'southwest', 'northwest'])
-        
-        # Calculate premium based on realistic factors
-        base_premium = 5000
-        premium = base_premium
-        
-        # Age factor: Premium increases with age
-        premium += (age - 18) * 50
-        
-        # BMI factor: Higher premiums for obesity and underweight
-        if bmi > 30:
-            premium += (bmi - 30) * 200  # Obesity penalty
-        elif bmi < 18.5:
-            premium += (18.5 - bmi) * 100  # Underweight penalty
-        
-        # Smoking factor: Major impact on premium
-        if smoker == 'yes':
-            premium += 15000 + np.random.normal(0, 2000)  # High smoking penalty with variance
-        
-        # Children factor: Each child adds to premium
-        premium += children * 1000
-        
-        # Gender factor: Slight difference (realistic but minimal)
-        if gender == 'male':
-            premium += 200
-        
-        # Region factor: Different costs in different regions
-        region_multipliers = {
-            'northeast': 1.1,   # Higher cost region
-            'southeast': 0.9,   # Lower cost region
-            'southwest': 0.95,  # Moderate cost region
-            'northwest': 1.05   # Moderate-high cost region
-        }
-        premium *= region_multipliers[region]
-        
-        # Add some realistic noise
-        premium += np.random.normal(0, 1000)
-        
-        # Ensure minimum premium
-        premium = max(premium, 1500)
-        
-        # Round to nearest dollar
-        premium = round(premium, 2)
-        
-        # Create record
-        record = {
-            'age': age,
-            'gender': gender,
-            'bmi': round(bmi, 1),
-            'children': children,
-            'smoker': smoker,
-            'region': region,
-            'premium': premium
-        }
-        
-        data.append(record)
-        
-        # Progress indicator
-        if (i + 1) % 100 == 0:
-            print(f"Generated {i + 1}/{n_samples} records...")
-    
-    # Create DataFrame
-    df = pd.DataFrame(data)
+    # Draw every column in one vectorized call instead of row by row
+    # Age: Normal distribution around 40, clipped to 18-64
+    ages = np.clip(np.random.normal(40, 12, n_samples), 18, 64).astype(np.int32)
+    
+    # Gender: Roughly equal distribution
+    genders = np.random.choice(['male', 'female'], n_samples, p=[0.51, 0.49])
+    
+    # BMI: Normal distribution around 28, clipped to realistic range
+    bmis = np.clip(np.random.normal(28, 6, n_samples), 15, 50)
+    
+    # Children: Poisson distribution (most people have 0-2 children)
+    children = np.clip(np.random.poisson(1, n_samples), 0, 5).astype(np.int32)
+    
+    # Smoker: 20% smoking rate (realistic for developed countries)
+    smokers = np.random.choice(['yes', 'no'], n_samples, p=[0.2, 0.8])
+    
+    # Region: Equal distribution across regions
+    region_idx = np.random.randint(0, len(REGIONS), n_samples).astype(np.int8)
+    regions = REGIONS[region_idx]
+    
+    # Noise: smoking penalty variance and overall realistic noise
+    noise_smoker = np.random.normal(0, 2000, n_samples)
+    noise_all = np.random.normal(0, 1000, n_samples)
+    
+    # Calculate premium based on realistic factors in one compiled pass
+    premiums = np.empty(n_samples, dtype=np.float64)
+    compute_premium(
+        ages, bmis, children,
+        (smokers == 'yes').astype(np.int8),
+        (genders == 'male').astype(np.int8),
+        region_idx, noise_smoker, noise_all, 200.0, 1500.0, premiums
+    )
+    
+    # Round to nearest cent
+    premiums = np.round(premiums, 2)
+    
+    # Create DataFrame with narrow numeric columns and categorical codes
+    df = pd.DataFrame({
+        'age': ages.astype(np.int8),
+        'gender': pd.Categorical(genders, categories=['male', 'female']),
+        'bmi': np.round(bmis, 1).astype(np.float32),
+        'children': children.astype(np.int8),
+        'smoker': pd.Categorical(smokers, categories=['no', 'yes']),
+        'region': pd.Categorical(regions, categories=REGIONS),
+        'premium': premiums.astype(np.float32)
+    })
     
     # Display statistics
     print("\nDataset Statistics:")
@@ -128,26 +98,34 @@ def add_realistic_variations(df):
     
     # Add some correlation between age and BMI (older people tend to have higher BMI)
     age_bmi_correlation = 0.3
-    for i in range(len(df)):
-        age_factor = (df.loc[i, 'age'] - 30) / 50  # Normalized age factor
-        bmi_adjustment = age_factor * 3 * age_bmi_correlation
-        df.loc[i, 'bmi'] = max(15, df.loc[i, 'bmi'] + bmi_adjustment)
+    age_factor = (df['age'].to_numpy() - 30) / 50.0  # Normalized age factor
+    bmi_adjustment = age_factor * 3 * age_bmi_correlation
+    df['bmi'] = np.maximum(15, df['bmi'].to_numpy() + bmi_adjustment).astype(np.float32)
     
     # Add seasonal variation (if we had dates)
     # This could be expanded to include temporal patterns
     
     return df
 
-def save_data(df, filename='insurance_data.csv'):
-    """Save the generated data to CSV file."""
-    df.to_csv(filename, index=False)
-    print(f"\nData saved to {filename}")
+def save_data(df, filename='insurance_data.parquet', write_csv=False):
+    """Save the generated data as zstd-compressed Parquet (and optionally CSV)."""
+    base, _ = os.path.splitext(filename)
+    
+    parquet_filename = f'{base}.parquet'
+    df.to_parquet(parquet_filename, engine='pyarrow', compression='zstd', index=False)
+    print(f"\nData saved to {parquet_filename}")
     
     # Also save a smaller sample for testing
     test_sample = df.sample(n=100, random_state=42)
-    test_filename = filename.replace('.csv', '_sample.csv')
-    test_sample.to_csv(test_filename, index=False)
+    test_filename = f'{base}_sample.parquet'
+    test_sample.to_parquet(test_filename, engine='pyarrow', compression='zstd', index=False)
     print(f"Test sample saved to {test_filename}")
+    
+    # CSV copies for human inspection
+    if write_csv:
+        df.to_csv(f'{base}.csv', index=False)
+        test_sample.to_csv(f'{base}_sample.csv', index=False)
+        print(f"CSV copies saved to {base}.csv and {base}_sample.csv")
 
 def generate_user_test_data():
     """Generate some test data for user interactions."""
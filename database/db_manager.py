@@ -1,10 +1,20 @@
 import sqlite3
 import os
+import atexit
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash
+from werkzeug.security import generate_password_hash, check_password_hash
 from config import Config
 from datetime import datetime
 
+log = logging.getLogger(__name__)
+
 # User class for Flask-Login
 class User(UserMixin):
     def __init__(self, id, username, email, is_admin=False):
@@ -13,12 +23,33 @@ class User(UserMixin):
         self.email = email
         self.is_admin = is_admin
 
+# One cached connection per thread, reused across requests
+_local = threading.local()
+
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(Config.DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Get the calling thread's cached database connection"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(
+            Config.DATABASE_PATH,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')  # 256 MB of memory-mapped reads
+        _local.conn = conn
     return conn
 
+def close_db_connection():
+    """Close the calling thread's cached connection (e.g. before forking)"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
 def init_database():
     """Initialize database with schema"""
     conn = get_db_connection()
@@ -28,8 +59,6 @@ def init_database():
         schema = f.read()
     
     conn.executescript(schema)
-    conn.commit()
-    conn.close()
 
 # def create_admin_user():
 #     """Create default admin user if not exists"""
@@ -61,69 +90,116 @@ def create_admin_user():
     ).fetchone()
 
     if admin:
-        print("Admin user already exists. Skipping admin creation.")
-        conn.close()
+        log.info("Admin user already exists. Skipping admin creation.")
         return
 
     # If no admin exists, create one
     password_hash = generate_password_hash(Config.DEFAULT_ADMIN_PASSWORD)
 
-    conn.execute(
-        'INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
-        (
-            Config.DEFAULT_ADMIN_USERNAME,
-            Config.DEFAULT_ADMIN_EMAIL,
-            password_hash,
-            True
+    try:
+        conn.execute('BEGIN')
+        conn.execute(
+            'INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
+            (
+                Config.DEFAULT_ADMIN_USERNAME,
+                Config.DEFAULT_ADMIN_EMAIL,
+                password_hash,
+                True
+            )
         )
-    )
-    conn.commit()
-    conn.close()
+        conn.commit()
+    except Exception:
+        # Don't leave the shared connection inside a failed transaction
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    invalidate_user_cache()
 
-    print(f"Admin user created: {Config.DEFAULT_ADMIN_USERNAME}")
+    log.info("Admin user created: %s", Config.DEFAULT_ADMIN_USERNAME)
 
 
 def create_user(username, email, password):
     """Create a new user"""
     conn = get_db_connection()
+    password_hash = generate_password_hash(password)
     try:
-        password_hash = generate_password_hash(password)
+        conn.execute('BEGIN')
         conn.execute(
             'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
             (username, email, password_hash)
         )
         conn.commit()
+        invalidate_user_cache()
+        invalidate_analytics_cache()
         return True
     except sqlite3.IntegrityError:
+        conn.rollback()
         return False
-    finally:
-        conn.close()
+    except Exception:
+        # Don't leave the shared connection inside a failed transaction
+        if conn.in_transaction:
+            conn.rollback()
+        raise
 
-def get_user_by_username(username):
-    """Get user by username"""
+# Bumped by every write that changes the analytics figures
+_analytics_version = 0
+
+def invalidate_analytics_cache():
+    """Mark cached analytics as stale after predictions or users change"""
+    global _analytics_version
+    _analytics_version += 1
+
+def get_analytics_version():
+    """Current analytics data version, used as the analytics cache key"""
+    return _analytics_version
+
+# Cached user lookups: ('id', user_id) or ('username', name) -> (expiry, User or None).
+# Entries expire after USER_CACHE_TTL so changes made through another worker
+# process (which can't clear this cache) are picked up within that window
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+USER_CACHE_MAX = 2048
+
+def invalidate_user_cache():
+    """Drop this process's cached user lookups after any change to the users table"""
+    with _user_cache_lock:
+        _user_cache.clear()
+
+def _get_user_cached(column, value):
+    key = (column, value)
+    now = time.monotonic()
+    entry = _user_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    
     conn = get_db_connection()
     user = conn.execute(
-        'SELECT * FROM users WHERE username = ?',
-        (username,)
+        f'SELECT id, username, email, is_admin FROM users WHERE {column} = ?',
+        (value,)
     ).fetchone()
-    conn.close()
-    
     if user:
-        return User(user['id'], user['username'], user['email'], user['is_admin'])
-    return None
+        user = User(user['id'], user['username'], user['email'], user['is_admin'])
+    
+    with _user_cache_lock:
+        if len(_user_cache) >= USER_CACHE_MAX:
+            for stale in [k for k, (expiry, _) in _user_cache.items() if expiry <= now]:
+                del _user_cache[stale]
+            if len(_user_cache) >= USER_CACHE_MAX:
+                _user_cache.clear()
+        _user_cache[key] = (now + Config.USER_CACHE_TTL, user)
+    return user
+
+def get_user_by_username(username):
+    """Get user by username"""
+    return _get_user_cached('username', username)
 
 def get_user_by_id(user_id):
-    """Get user by ID"""
-    conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE id = ?',
-        (user_id,)
-    ).fetchone()
-    conn.close()
-    
-    if user:
-        return User(user['id'], user['username'], user['email'], user['is_admin'])
-    return None
+    """Get user by ID (called by Flask-Login on every request)"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    return _get_user_cached('id', user_id)
 
 def get_user_by_email(email):
     """Get user by email"""
@@ -132,55 +208,188 @@ def get_user_by_email(email):
         'SELECT * FROM users WHERE email = ?',
         (email,)
     ).fetchone()
-    conn.close()
     
     if user:
         return User(user['id'], user['username'], user['email'], user['is_admin'])
     return None
 
+def check_user_exists(username, email):
+    """Return (username_taken, email_taken) from a single query"""
+    conn = get_db_connection()
+    taken = conn.execute(
+        '''SELECT MAX(username = ?) AS username_taken, MAX(email = ?) AS email_taken
+           FROM users
+           WHERE username = ? OR email = ?''',
+        (username, email, username, email)
+    ).fetchone()
+    return bool(taken['username_taken']), bool(taken['email_taken'])
+
+# Recently verified logins: HMAC(stored hash, password) -> expiry time. The HMAC
+# key is random per process, so the cached digests can't be used to test
+# password guesses offline the way a plain sha256 of the password could
+_verified_logins = {}
+_verified_logins_key = os.urandom(32)
+_verified_logins_lock = threading.Lock()
+VERIFIED_LOGINS_MAX = 1024
+
 def verify_password(username, password):
     """Verify user password"""
-    from werkzeug.security import check_password_hash
-    
     conn = get_db_connection()
     user = conn.execute(
         'SELECT password_hash FROM users WHERE username = ?',
         (username,)
     ).fetchone()
-    conn.close()
     
-    if user and check_password_hash(user['password_hash'], password):
+    if not user:
+        return False
+    
+    # Covers the stored hash, so a password change invalidates the entry
+    key = hmac.new(
+        _verified_logins_key,
+        user['password_hash'].encode() + b'\0' + password.encode(),
+        hashlib.sha256
+    ).digest()
+    now = time.monotonic()
+    if _verified_logins.get(key, 0) > now:
         return True
-    return False
+    
+    if not check_password_hash(user['password_hash'], password):
+        return False
+    
+    with _verified_logins_lock:
+        if len(_verified_logins) >= VERIFIED_LOGINS_MAX:
+            for stale in [k for k, expiry in _verified_logins.items() if expiry <= now]:
+                del _verified_logins[stale]
+            if len(_verified_logins) >= VERIFIED_LOGINS_MAX:
+                _verified_logins.clear()
+        _verified_logins[key] = now + Config.LOGIN_CACHE_TTL
+    return True
 
-def save_prediction(user_id, age, gender, bmi, children, smoker, region, premium):
-    """Save prediction to database"""
+_INSERT_PREDICTION_SQL = '''INSERT INTO predictions 
+               (user_id, age, gender, bmi, children, smoker, region, predicted_premium)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+
+PREDICTION_BATCH_SIZE = 100
+PREDICTION_FLUSH_INTERVAL = 0.05  # seconds to wait for a batch to fill up
+PREDICTION_QUEUE_SIZE = 10000
+PREDICTION_SAVE_TIMEOUT = 5  # seconds save_prediction_and_wait waits for the commit
+
+# Pending (row, future) pairs drained by the background prediction writer.
+# Bounded, so a stalled database pushes back on callers instead of growing memory
+_prediction_queue = queue.Queue(maxsize=PREDICTION_QUEUE_SIZE)
+_writer_thread = None
+_writer_lock = threading.Lock()
+_STOP_WRITER = object()
+
+def _write_prediction_batch(batch):
+    """Insert a batch of queued predictions in a single transaction"""
     conn = get_db_connection()
+    cursor = conn.cursor()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            '''INSERT INTO predictions 
-               (user_id, age, gender, bmi, children, smoker, region, predicted_premium)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-            (user_id, age, gender, bmi, children, smoker, region, premium)
-        )
+        cursor.execute('BEGIN')
+        prediction_ids = []
+        for row, _ in batch:
+            cursor.execute(_INSERT_PREDICTION_SQL, row)
+            prediction_ids.append(cursor.lastrowid)
         conn.commit()
-        prediction_id = cursor.lastrowid
-        print(f"Saved prediction {prediction_id} for user {user_id}: ${premium:.2f}")
-        return prediction_id
     except Exception as e:
-        print(f"Error saving prediction: {e}")
         conn.rollback()
+        if len(batch) > 1:
+            # Don't let one bad row drop everyone else's predictions
+            log.warning("Batch of %d predictions failed (%s), retrying row by row", len(batch), e)
+            for item in batch:
+                _write_prediction_batch([item])
+            return
+        log.error("Error saving prediction: %s", e)
+        prediction_ids = [None]
+    else:
+        invalidate_analytics_cache()
+        log.debug("Saved %d prediction(s), last id %s", len(batch), prediction_ids[-1])
+    
+    for (_, future), prediction_id in zip(batch, prediction_ids):
+        future.set_result(prediction_id)
+
+def _prediction_writer_loop():
+    """Block for the next prediction, then collect a batch for up to PREDICTION_FLUSH_INTERVAL"""
+    while True:
+        item = _prediction_queue.get()
+        if item is _STOP_WRITER:
+            return
+        batch = [item]
+        stop = False
+        deadline = time.monotonic() + PREDICTION_FLUSH_INTERVAL
+        while len(batch) < PREDICTION_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _prediction_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP_WRITER:
+                stop = True
+                break
+            batch.append(item)
+        _write_prediction_batch(batch)
+        if stop:
+            return
+
+def _ensure_prediction_writer():
+    global _writer_thread
+    if _writer_thread is None:
+        with _writer_lock:
+            if _writer_thread is None:
+                _writer_thread = threading.Thread(
+                    target=_prediction_writer_loop, name='prediction-writer', daemon=True
+                )
+                _writer_thread.start()
+
+@atexit.register
+def _flush_prediction_writer():
+    """Write out predictions still queued when the process exits"""
+    if _writer_thread is not None and _writer_thread.is_alive():
+        _prediction_queue.put(_STOP_WRITER)
+        _writer_thread.join(timeout=5)
+
+def save_prediction(user_id, age, gender, bmi, children, smoker, region, premium):
+    """Queue a prediction for the background writer.
+
+    Returns a Future that resolves to the new prediction id (or None on error).
+    """
+    _ensure_prediction_writer()
+    future = Future()
+    row = (user_id, age, gender, bmi, children, smoker, region, premium)
+    _prediction_queue.put((row, future))
+    return future
+
+def save_prediction_and_wait(user_id, age, gender, bmi, children, smoker, region, premium):
+    """Queue a prediction and wait for the background writer to commit it.
+
+    For request paths that read the prediction back right away (e.g. redirect
+    to the dashboard). Returns the new prediction id, or None on error/timeout.
+    """
+    future = save_prediction(user_id, age, gender, bmi, children, smoker, region, premium)
+    try:
+        return future.result(timeout=PREDICTION_SAVE_TIMEOUT)
+    except TimeoutError:
+        log.warning("Prediction for user %s not committed within %ss", user_id, PREDICTION_SAVE_TIMEOUT)
         return None
-    finally:
-        conn.close()
+
+def save_prediction_sync(user_id, age, gender, bmi, children, smoker, region, premium):
+    """Save prediction to database immediately (admin tools and scripts)"""
+    future = Future()
+    row = (user_id, age, gender, bmi, children, smoker, region, premium)
+    _write_prediction_batch([(row, future)])
+    return future.result()
 
 def get_user_predictions(user_id, limit=50):
     """Get user's prediction history"""
     conn = get_db_connection()
     try:
         predictions = conn.execute(
-            '''SELECT * FROM predictions 
+            '''SELECT id, user_id, age, gender, bmi, children, smoker, region,
+                      predicted_premium, created_at
+               FROM predictions 
                WHERE user_id = ? 
                ORDER BY created_at DESC 
                LIMIT ?''',
@@ -188,64 +397,87 @@ def get_user_predictions(user_id, limit=50):
         ).fetchall()
         
         # Convert to list of dicts for easier handling
-        result = []
-        for pred in predictions:
-            result.append({
-                'id': pred['id'],
-                'user_id': pred['user_id'],
-                'age': pred['age'],
-                'gender': pred['gender'],
-                'bmi': pred['bmi'],
-                'children': pred['children'],
-                'smoker': pred['smoker'],
-                'region': pred['region'],
-                'predicted_premium': pred['predicted_premium'],
-                'created_at': pred['created_at']
-            })
+        result = [dict(pred) for pred in predictions]
         
-        print(f"Retrieved {len(result)} predictions for user {user_id}")
+        log.debug("Retrieved %d predictions for user %s", len(result), user_id)
         return result
     except Exception as e:
-        print(f"Error getting user predictions: {e}")
+        log.error("Error getting user predictions: %s", e)
         return []
-    finally:
-        conn.close()
 
-def get_all_predictions():
-    """Get all predictions (admin only)"""
+def get_user_stats(user_id):
+    """Prediction count, average premium and latest prediction for one user.
+
+    Read from the trigger-maintained user_stats row (see schema.sql).
+    Returns (total, avg_premium, latest) where latest is a dict or None.
+    """
     conn = get_db_connection()
     try:
-        predictions = conn.execute(
-            '''SELECT p.*, u.username 
+        stats = conn.execute(
+            'SELECT total, sum_premium, latest_id FROM user_stats WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        if stats is None or not stats['total']:
+            return 0, 0, None
+        
+        latest = conn.execute(
+            '''SELECT id, user_id, age, gender, bmi, children, smoker, region,
+                      predicted_premium, created_at
+               FROM predictions
+               WHERE id = ?''',
+            (stats['latest_id'],)
+        ).fetchone()
+    except Exception as e:
+        log.error("Error getting user stats: %s", e)
+        return 0, 0, None
+    
+    return stats['total'], stats['sum_premium'] / stats['total'], dict(latest) if latest else None
+
+_ALL_PREDICTIONS_SQL = '''SELECT p.*, u.username 
                FROM predictions p
                JOIN users u ON p.user_id = u.id
                ORDER BY p.created_at DESC'''
+
+def get_all_predictions(limit=100, offset=0):
+    """Get a page of all predictions, newest first (admin only).
+
+    Pass limit=None to fetch every prediction.
+    """
+    conn = get_db_connection()
+    try:
+        predictions = conn.execute(
+            _ALL_PREDICTIONS_SQL + ' LIMIT ? OFFSET ?',
+            (-1 if limit is None else limit, offset)
         ).fetchall()
         
         # Convert to list of dicts
-        result = []
-        for pred in predictions:
-            result.append({
-                'id': pred['id'],
-                'user_id': pred['user_id'],
-                'username': pred['username'],
-                'age': pred['age'],
-                'gender': pred['gender'],
-                'bmi': pred['bmi'],
-                'children': pred['children'],
-                'smoker': pred['smoker'],
-                'region': pred['region'],
-                'predicted_premium': pred['predicted_premium'],
-                'created_at': pred['created_at']
-            })
+        result = [dict(pred) for pred in predictions]
         
-        print(f"Retrieved {len(result)} total predictions for admin")
+        log.debug("Retrieved %d total predictions for admin", len(result))
         return result
     except Exception as e:
-        print(f"Error getting all predictions: {e}")
+        log.error("Error getting all predictions: %s", e)
         return []
-    finally:
-        conn.close()
+
+def get_recent_predictions(limit=10):
+    """Get the newest `limit` predictions, read straight off idx_created_at"""
+    return get_all_predictions(limit=limit)
+
+def count_all_predictions():
+    """Number of rows get_all_predictions pages over"""
+    conn = get_db_connection()
+    return conn.execute(
+        'SELECT COUNT(*) FROM predictions p JOIN users u ON p.user_id = u.id'
+    ).fetchone()[0]
+
+def iter_all_predictions():
+    """Yield every prediction as a dict without materializing the full list.
+
+    Feeds the streamed admin CSV export (admin.export_predictions).
+    """
+    conn = get_db_connection()
+    for pred in conn.execute(_ALL_PREDICTIONS_SQL):
+        yield dict(pred)
 
 def get_all_users():
     """Get all users (admin only)"""
@@ -253,32 +485,136 @@ def get_all_users():
     users = conn.execute(
         'SELECT id, username, email, is_admin, created_at FROM users ORDER BY created_at DESC'
     ).fetchall()
-    conn.close()
     return users
 
 def get_statistics():
     """Get application statistics"""
     conn = get_db_connection()
     
-    # Total users
-    total_users = conn.execute('SELECT COUNT(*) FROM users WHERE is_admin = 0').fetchone()[0]
+    # All metrics in a single round trip and a single scan of predictions
+    stats = conn.execute(
+        '''SELECT
+               (SELECT COUNT(*) FROM users WHERE is_admin = 0) AS total_users,
+               COUNT(*) AS total_predictions,
+               COALESCE(AVG(predicted_premium), 0) AS avg_premium,
+               COALESCE(SUM(CASE WHEN created_at >= datetime('now', '-30 days')
+                                 THEN 1 ELSE 0 END), 0) AS recent_predictions
+           FROM predictions'''
+    ).fetchone()
+    
+    return {
+        'total_users': stats['total_users'],
+        'total_predictions': stats['total_predictions'],
+        'average_premium': round(stats['avg_premium'], 2),
+        'recent_predictions': stats['recent_predictions']
+    }
+
+_ANALYTICS_TOTALS_SQL = '''SELECT
+               (SELECT COUNT(*) FROM users WHERE is_admin = 0) AS total_users,
+               COUNT(*) AS total_predictions,
+               COALESCE(SUM(predicted_premium), 0) AS total_revenue,
+               COALESCE(SUM(predicted_premium * predicted_premium), 0) AS sum_squares,
+               COALESCE(MIN(predicted_premium), 0) AS min_premium,
+               COALESCE(MAX(predicted_premium), 0) AS max_premium
+           FROM predictions'''
+
+# Bucket counters maintained by the analytics_summary triggers (see schema.sql)
+_ANALYTICS_SUMMARY_SQL = '''SELECT bucket_type, bucket_label, count
+           FROM analytics_summary
+           ORDER BY bucket_type, lower_bound'''
+
+_TOP_USERS_SQL = '''SELECT u.username,
+                  COUNT(*) AS prediction_count,
+                  AVG(p.predicted_premium) AS avg_premium,
+                  SUM(p.predicted_premium) AS total_premium
+           FROM predictions p
+           JOIN users u ON p.user_id = u.id
+           GROUP BY p.user_id
+           ORDER BY prediction_count DESC
+           LIMIT ?'''
+
+# Runs independent read queries concurrently; each worker thread uses its own connection
+_query_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='db-query')
+
+def _fetch_all(sql, params=()):
+    return get_db_connection().execute(sql, params).fetchall()
+
+def _bucket_counts(rows):
+    """Group analytics_summary rows into {bucket_type: {bucket_label: count}}"""
+    buckets = {'premium_range': {}, 'age': {}, 'risk': {}}
+    for row in rows:
+        buckets[row['bucket_type']][row['bucket_label']] = row['count']
+    return buckets
+
+def get_analytics_aggregates():
+    """Aggregate the analytics dashboard figures in SQL instead of in Python"""
+    # The queries don't depend on each other, so wait for them only once
+    totals, summary, top_users = [
+        future.result() for future in [
+            _query_pool.submit(_fetch_all, _ANALYTICS_TOTALS_SQL),
+            _query_pool.submit(_fetch_all, _ANALYTICS_SUMMARY_SQL),
+            _query_pool.submit(_fetch_all, _TOP_USERS_SQL, (5,))
+        ]
+    ]
+    totals = totals[0]
+    buckets = _bucket_counts(summary)
+    
+    # Mean and standard deviation from the sums of the same single scan
+    n = totals['total_predictions']
+    mean = totals['total_revenue'] / n if n else 0
+    variance = max(totals['sum_squares'] / n - mean * mean, 0) if n else 0
     
-    # Total predictions
-    total_predictions = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
+    return {
+        'basic_stats': {
+            'total_revenue': totals['total_revenue'],
+            'total_users': totals['total_users'],
+            'total_predictions': n,
+            'average_premium': mean,
+            'min_premium': totals['min_premium'],
+            'max_premium': totals['max_premium'],
+            'premium_stddev': variance ** 0.5
+        },
+        'premium_ranges': buckets['premium_range'],
+        'age_distribution': buckets['age'],
+        'risk_distribution': buckets['risk'],
+        'top_users': [dict(row) for row in top_users]
+    }
+
+def get_prediction_breakdowns():
+    """Prediction counts by region, smoker status and age group, plus the average premium"""
+    conn = get_db_connection()
     
-    # Average premium
-    avg_premium = conn.execute('SELECT AVG(predicted_premium) FROM predictions').fetchone()[0] or 0
+    totals = conn.execute(
+        'SELECT COUNT(*) AS total, AVG(predicted_premium) AS avg_premium FROM predictions'
+    ).fetchone()
     
-    # Recent predictions count (last 30 days)
-    recent_predictions = conn.execute(
-        "SELECT COUNT(*) FROM predictions WHERE created_at >= datetime('now', '-30 days')"
-    ).fetchone()[0]
+    regions = conn.execute(
+        'SELECT region, COUNT(*) AS count FROM predictions GROUP BY region'
+    ).fetchall()
     
-    conn.close()
+    smokers = conn.execute(
+        'SELECT smoker, COUNT(*) AS count FROM predictions GROUP BY smoker'
+    ).fetchall()
+    
+    # Right-closed bins over (0, 25], (25, 35], (35, 45], (45, 55], (55, 100]
+    age_groups = conn.execute(
+        '''SELECT CASE
+                      WHEN age <= 25 THEN '0-25'
+                      WHEN age <= 35 THEN '26-35'
+                      WHEN age <= 45 THEN '36-45'
+                      WHEN age <= 55 THEN '46-55'
+                      ELSE '56-100'
+                  END AS bucket,
+                  COUNT(*) AS count
+           FROM predictions
+           WHERE age > 0 AND age <= 100
+           GROUP BY bucket'''
+    ).fetchall()
     
     return {
-        'total_users': total_users,
-        'total_predictions': total_predictions,
-        'average_premium': round(avg_premium, 2),
-        'recent_predictions': recent_predictions
-    }
\ No newline at end of file
+        'total_predictions': totals['total'],
+        'avg_premium': totals['avg_premium'] or 0,
+        'region_counts': {row['region']: row['count'] for row in regions},
+        'smoker_counts': {row['smoker']: row['count'] for row in smokers},
+        'age_groups': {row['bucket']: row['count'] for row in age_groups}
+    }
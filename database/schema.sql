@@ -24,6 +24,103 @@ CREATE TABLE IF NOT EXISTS predictions (
 );
 
 -- Index for better query performance
-CREATE INDEX IF NOT EXISTS idx_user_predictions ON predictions(user_id);
+-- (user_id, created_at) serves per-user history ordered by date and also
+-- covers plain user_id lookups, so the old single-column index is dropped
+DROP INDEX IF EXISTS idx_user_predictions;
+CREATE INDEX IF NOT EXISTS idx_pred_user_time ON predictions(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_created_at ON predictions(created_at);
+-- Serves the premium bucketing and SUM/AVG scans in the analytics queries
+CREATE INDEX IF NOT EXISTS idx_pred_premium ON predictions(predicted_premium);
 
+-- Per-bucket prediction counters for the analytics dashboard, kept current
+-- by the triggers below so reads never scan the predictions table.
+-- A bucket holds values in [lower_bound, upper_bound); 1e999 is infinity.
+CREATE TABLE IF NOT EXISTS analytics_summary (
+    bucket_type VARCHAR(20) NOT NULL,
+    bucket_label VARCHAR(20) NOT NULL,
+    lower_bound REAL NOT NULL,
+    upper_bound REAL NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    total_premium REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_type, bucket_label)
+);
+
+-- Seed the buckets, backfilled from any existing predictions. Rows that are
+-- already there are left alone since the triggers have kept them current.
+INSERT OR IGNORE INTO analytics_summary
+    (bucket_type, bucket_label, lower_bound, upper_bound, count, total_premium)
+SELECT b.column1, b.column2, b.column3, b.column4,
+       COUNT(p.id), COALESCE(SUM(p.predicted_premium), 0)
+FROM (VALUES
+    ('premium_range', 'Under $5K', -1e999, 5000),
+    ('premium_range', '$5K - $10K', 5000, 10000),
+    ('premium_range', '$10K - $15K', 10000, 15000),
+    ('premium_range', '$15K - $20K', 15000, 20000),
+    ('premium_range', 'Over $20K', 20000, 1e999),
+    ('age', '18-24', -1e999, 25),
+    ('age', '25-34', 25, 35),
+    ('age', '35-44', 35, 45),
+    ('age', '45-54', 45, 55),
+    ('age', '55+', 55, 1e999),
+    ('risk', 'low', -1e999, 8000),
+    ('risk', 'medium', 8000, 16000),
+    ('risk', 'high', 16000, 1e999)
+) b
+LEFT JOIN predictions p
+    ON (CASE b.column1 WHEN 'age' THEN p.age ELSE p.predicted_premium END) >= b.column3
+   AND (CASE b.column1 WHEN 'age' THEN p.age ELSE p.predicted_premium END) < b.column4
+GROUP BY b.column1, b.column2;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_summary_insert
+AFTER INSERT ON predictions
+BEGIN
+    UPDATE analytics_summary
+    SET count = count + 1, total_premium = total_premium + NEW.predicted_premium
+    WHERE (CASE bucket_type WHEN 'age' THEN NEW.age ELSE NEW.predicted_premium END) >= lower_bound
+      AND (CASE bucket_type WHEN 'age' THEN NEW.age ELSE NEW.predicted_premium END) < upper_bound;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_summary_delete
+AFTER DELETE ON predictions
+BEGIN
+    UPDATE analytics_summary
+    SET count = count - 1, total_premium = total_premium - OLD.predicted_premium
+    WHERE (CASE bucket_type WHEN 'age' THEN OLD.age ELSE OLD.predicted_premium END) >= lower_bound
+      AND (CASE bucket_type WHEN 'age' THEN OLD.age ELSE OLD.predicted_premium END) < upper_bound;
+END;
+
+-- Per-user prediction totals for the profile page, maintained by triggers
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    sum_premium REAL NOT NULL DEFAULT 0,
+    latest_id INTEGER,
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+
+-- Backfill users with existing predictions; rows already present are current
+INSERT OR IGNORE INTO user_stats (user_id, total, sum_premium, latest_id)
+SELECT user_id, COUNT(*), SUM(predicted_premium), MAX(id)
+FROM predictions
+GROUP BY user_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_stats_insert
+AFTER INSERT ON predictions
+BEGIN
+    INSERT INTO user_stats (user_id, total, sum_premium, latest_id)
+    VALUES (NEW.user_id, 1, NEW.predicted_premium, NEW.id)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total = total + 1,
+        sum_premium = sum_premium + excluded.sum_premium,
+        latest_id = MAX(COALESCE(latest_id, 0), excluded.latest_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_stats_delete
+AFTER DELETE ON predictions
+BEGIN
+    UPDATE user_stats
+    SET total = total - 1,
+        sum_premium = sum_premium - OLD.predicted_premium,
+        latest_id = (SELECT MAX(id) FROM predictions WHERE user_id = OLD.user_id)
+    WHERE user_id = OLD.user_id;
+END;
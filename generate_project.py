@@ -6,6 +6,8 @@ Run this script to create all project files automatically.
 
 import os
 import shutil
+import subprocess
+import sys
 
 def create_directory_structure():
     """Create the complete directory structure."""
@@ -35,6 +37,14 @@ def create_directory_structure():
         with open(init_path, 'w') as f:
             f.write(f'# {init_dir} module\n')
         print(f"Created: {init_path}")
+    
+    # Pre-compile the Numba premium kernel so the first call has no JIT cost
+    if os.path.exists(os.path.join('models', '_aot_build.py')):
+        result = subprocess.run([sys.executable, '-m', 'models._aot_build'])
+        if result.returncode == 0:
+            print("Compiled: models/premium_aot")
+        else:
+            print("Skipped AOT build, the kernel will be JIT compiled on first use")
 
 def create_requirements_txt():
     """Create requirements.txt file."""
@@ -44,7 +54,13 @@ Werkzeug==2.3.7
 scikit-learn==1.3.0
 pandas==2.1.1
 numpy==1.25.2
-joblib==1.3.2"""
+joblib==1.3.2
+xgboost>=2.0
+numba==0.58.1
+pyarrow==14.0.1
+gunicorn==21.2.0
+orjson==3.9.10
+sqlite3"""
     
     with open('requirements.txt', 'w') as f:
         f.write(requirements)
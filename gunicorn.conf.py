@@ -0,0 +1,31 @@
+# Gunicorn configuration: gunicorn -c gunicorn.conf.py app:app
+import multiprocessing
+
+bind = '0.0.0.0:5000'
+# Real OS threads rather than gevent: the app relies on threading.local
+# connections, a background writer thread and locks, none of which are
+# greenlet-safe without monkey-patching. Fewer processes with several
+# threads each also means fewer copies of the per-process model and caches.
+workers = multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = 4
+keepalive = 30
+
+# Import the app once in the master so workers share it copy-on-write
+preload_app = True
+
+
+def when_ready(server):
+    """Prepare the database and load the ML model before workers are forked"""
+    from database.db_manager import init_database, create_admin_user, close_db_connection
+    from models.ml_model import get_predictor
+    from utils._numeric import warm_up
+
+    init_database()
+    create_admin_user()
+    # SQLite connections must not be inherited across fork
+    close_db_connection()
+
+    get_predictor()
+    # Compile the numeric kernels once here instead of in the first request
+    warm_up()
@@ -1,138 +1,297 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+
+try:
+    # oneDAL-backed RandomForest and friends, must be patched before the imports below
+    from sklearnex import patch_sklearn
+    patch_sklearn()
+except ImportError:  # scikit-learn-intelex is optional
+    pass
+
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.linear_model import LinearRegression
+import xgboost
 from xgboost import XGBRegressor
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import (
-    mean_absolute_error,
-    mean_squared_error,
-    mean_absolute_percentage_error,
-    r2_score
-)
-import matplotlib.pyplot as plt
+from sklearn.preprocessing import StandardScaler
+import matplotlib
 import joblib
+from joblib import Parallel, delayed
+import json
 import os
+import threading
+from functools import lru_cache
+from models._premium_kernel import REGIONS, compute_premium
+
+try:
+    import lz4  # noqa: F401  enables joblib's lz4 compressor
+    COMPRESS = ('lz4', 3)
+except ImportError:
+    COMPRESS = ('zlib', 3)
+
+try:
+    import treelite
+    import treelite_runtime
+except ImportError:  # treelite is optional, models are then served by sklearn/xgboost
+    treelite = None
+
+FEATURE_COLUMNS = ['age', 'gender', 'bmi', 'children', 'smoker', 'region']
+MODEL_NAMES = ["LinearRegression", "DecisionTree", "RandomForest", "HistGradientBoosting", "XGBoost"]
+# Comparison table from the last training run, used to pick the served model
+PERFORMANCE_PATH = 'models/model_performance.csv'
+# Tree models compiled to native prediction libraries when treelite is installed
+TREELITE_MODELS = {"DecisionTree", "RandomForest", "XGBoost"}
+# Batches larger than this are split into chunks and scored on a thread pool
+PARALLEL_PREDICT_THRESHOLD = 1000
+
+
+@lru_cache(maxsize=1)
+def xgb_device():
+    """Return 'cuda' if XGBoost can train on a GPU here, otherwise 'cpu'"""
+    try:
+        if not xgboost.build_info().get("USE_CUDA"):
+            return "cpu"
+        probe = XGBRegressor(n_estimators=1, tree_method="hist", device="cuda")
+        probe.fit(np.zeros((2, 1)), np.zeros(2))
+        # Without a visible GPU XGBoost may fall back to the CPU rather than raise,
+        # so check the device the booster actually trained on
+        config = json.loads(probe.get_booster().save_config())
+        device = config["learner"]["generic_param"].get("device", "cpu")
+    except Exception:
+        return "cpu"
+    return "cuda" if device.startswith("cuda") else "cpu"
 
 
 class InsurancePremiumPredictor:
+    # Known categories, sorted so the codes match the old LabelEncoder ones
+    _cats = {
+        'gender': np.array(['female', 'male']),
+        'smoker': np.array(['no', 'yes']),
+        'region': np.array(['northeast', 'northwest', 'southeast', 'southwest'])
+    }
+    _codes = {col: {value: code for code, value in enumerate(cats)} for col, cats in _cats.items()}
+
     def __init__(self):
         self.models = {}
+        # Subset of self.models used by predict unless all models are requested
+        self.serve_models = []
+        self.compiled = {}
         self.scaler = None
-        self.label_encoders = {}
+        self._mean = None
+        self._scale = None
+        # Per-thread scratch row for single predictions: age, gender, bmi, children, smoker, region
+        self._buffers = threading.local()
         os.makedirs('models', exist_ok=True)
         os.makedirs('data', exist_ok=True)
 
-    def prepare_data(self):
-        """Generate synthetic insurance data for training"""
-        np.random.seed(42)
+    def prepare_data(self, save_csv=False):
+        """Generate synthetic insurance data as (column arrays dict, premium array).
+
+        Pass save_csv=True to also write the data to data/insurance_data.csv.
+        """
+        rng = np.random.default_rng(42)
         n_samples = 1000
 
-        ages = np.random.randint(18, 65, n_samples)
-        genders = np.random.choice(['male', 'female'], n_samples)
-        bmis = np.random.normal(28, 6, n_samples)
-        bmis = np.clip(bmis, 15, 50)
-        children = np.random.poisson(1, n_samples)
-        children = np.clip(children, 0, 5)
-        smokers = np.random.choice(['yes', 'no'], n_samples, p=[0.2, 0.8])
-        regions = np.random.choice(['northeast', 'southeast', 'southwest', 'northwest'], n_samples)
-
-        base_premium = 5000
-        premiums = []
-
-        for i in range(n_samples):
-            premium = base_premium
-            premium += (ages[i] - 18) * 50
-            if bmis[i] > 30:
-                premium += (bmis[i] - 30) * 200
-            elif bmis[i] < 18.5:
-                premium += (18.5 - bmis[i]) * 100
-            if smokers[i] == 'yes':
-                premium += 15000
-            premium += children[i] * 1000
-            if genders[i] == 'male':
-                premium += 500
-            region_multipliers = {
-                'northeast': 1.1,
-                'southeast': 0.9,
-                'southwest': 0.95,
-                'northwest': 1.05
-            }
-            premium *= region_multipliers[regions[i]]
-            premium += np.random.normal(0, 1000)
-            premium = max(premium, 1000)
-            premiums.append(premium)
-
-        data = pd.DataFrame({
+        ages = rng.integers(18, 65, n_samples, dtype=np.int32)
+        genders = rng.choice(['male', 'female'], n_samples)
+        # Scale and clip the draws in place rather than allocating new arrays
+        bmis = rng.standard_normal(n_samples)
+        bmis *= 6
+        bmis += 28
+        np.clip(bmis, 15, 50, out=bmis)
+        children = rng.poisson(1, n_samples).astype(np.int32)
+        np.clip(children, 0, 5, out=children)
+        smokers = rng.choice(['yes', 'no'], n_samples, p=[0.2, 0.8])
+        # Regions are drawn as int8 codes into REGIONS; the names only exist for the output
+        region_idx = rng.integers(0, len(REGIONS), n_samples, dtype=np.int8)
+        regions = REGIONS[region_idx]
+
+        # Encode categoricals as int8 codes and compute premiums in one compiled pass
+        noise = rng.standard_normal(n_samples)
+        noise *= 1000
+        premiums = np.empty(n_samples, dtype=np.float64)
+        compute_premium(
+            ages, bmis, children,
+            (smokers == 'yes').astype(np.int8),
+            (genders == 'male').astype(np.int8),
+            region_idx, np.zeros(n_samples), noise,
+            500.0, 1000.0, premiums
+        )
+
+        features = {
             'age': ages,
             'gender': genders,
             'bmi': bmis,
             'children': children,
             'smoker': smokers,
-            'region': regions,
-            'premium': premiums
-        })
+            'region': regions
+        }
+
+        if save_csv:
+            pd.DataFrame({**features, 'premium': premiums}).to_csv('data/insurance_data.csv', index=False)
+        return features, premiums
 
-        data.to_csv('data/insurance_data.csv', index=False)
-        return data
+    def encode_column(self, col, values):
+        """Map category strings to their int8 codes, rejecting unknown values"""
+        cats = self._cats[col]
+        values = np.asarray(values, dtype=str)
+        codes = np.searchsorted(cats, values)
+        if not np.array_equal(cats[np.minimum(codes, len(cats) - 1)], values):
+            raise ValueError(f"Unknown {col} value in {np.setdiff1d(values, cats)}")
+        return codes.astype(np.int8)
 
     def preprocess_features(self, data):
         processed_data = data.copy()
-        categorical_columns = ['gender', 'smoker', 'region']
-        for col in categorical_columns:
-            if col not in self.label_encoders:
-                self.label_encoders[col] = LabelEncoder()
-                processed_data[col] = self.label_encoders[col].fit_transform(processed_data[col])
-            else:
-                processed_data[col] = self.label_encoders[col].transform(processed_data[col])
+        for col in self._cats:
+            processed_data[col] = self.encode_column(col, data[col].values)
         return processed_data
 
+    def _cache_scaler(self):
+        """Keep the fitted scaler's mean/scale as float32 arrays for predict"""
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._scale = self.scaler.scale_.astype(np.float32)
+
+    def _compile_treelite(self, name, model):
+        """Compile a fitted tree model to models/{name}.so and return its path, or None"""
+        libpath = f'models/{name}.so'
+        if os.path.exists(libpath):
+            os.remove(libpath)  # never serve a library built from an older model
+        if treelite is None or name not in TREELITE_MODELS:
+            return None
+        try:
+            if name == "XGBoost":
+                # Drop the rounds boosted past the early-stopping optimum
+                booster = model.get_booster()[:model.best_iteration + 1]
+                tl_model = treelite.Model.from_xgboost(booster)
+            else:
+                tl_model = treelite.sklearn.import_model(model)
+            tl_model.export_lib(toolchain='gcc', libpath=libpath, params={'parallel_comp': os.cpu_count() or 1})
+        except Exception as e:
+            print(f"⚠️ Treelite compilation failed for {name}: {e}")
+            return None
+        return libpath
+
+    def _load_compiled(self):
+        """Load the native predictors built by _compile_treelite"""
+        self.compiled = {}
+        if treelite is None:
+            return
+        for name in TREELITE_MODELS & self.models.keys():
+            libpath = f'models/{name}.so'
+            if os.path.exists(libpath):
+                self.compiled[name] = treelite_runtime.Predictor(libpath)
+
+    def _model_predict(self, name, X):
+        """Predict with the compiled library for a model if there is one"""
+        if name in self.compiled:
+            return np.ravel(self.compiled[name].predict(treelite_runtime.DMatrix(X)))
+        return self.models[name].predict(X)
+
+    def _all_metrics(self, y_true, y_pred):
+        """Compute MAE, MSE, RMSE, MAPE(%) and R² from a single residual pass"""
+        y_true = np.asarray(y_true, dtype=np.float64)
+        diff = y_true - y_pred
+        abs_diff = np.abs(diff)
+        sq = diff * diff
+        mae = abs_diff.mean()
+        mse = sq.mean()
+        rmse = np.sqrt(mse)
+        mape = (abs_diff / np.abs(y_true)).mean() * 100
+        ss_tot = ((y_true - y_true.mean()) ** 2).sum()
+        r2 = 1 - sq.sum() / ss_tot
+        return mae, mse, rmse, mape, r2
+
+    def _fit_eval(self, name, model, X_train, y_train, X_test, y_test):
+        """Fit one model and return (name, model, metrics) for the comparison table"""
+        if name == "XGBoost":
+            # Early-stop on 10% of the (already shuffled) training rows
+            n_val = len(X_train) // 10
+            model.fit(
+                X_train[n_val:], y_train[n_val:],
+                eval_set=[(X_train[:n_val], y_train[:n_val])], verbose=False
+            )
+        else:
+            model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        mae, mse, rmse, mape, r2 = self._all_metrics(y_test, y_pred)
+        adj_r2 = self.adjusted_r2(r2, len(y_test), X_test.shape[1])
+        return name, model, (mae, mse, rmse, mape, r2, adj_r2)
+
+    def _select_serve_models(self, results_df=None):
+        """Serve only the model with the best test R², falling back to all models"""
+        if results_df is None and os.path.exists(PERFORMANCE_PATH):
+            results_df = pd.read_csv(PERFORMANCE_PATH)
+        r2_column = None
+        if results_df is not None and 'Model' in results_df:
+            # Older comparison tables (like the checked-in one) spell the column 'R2'
+            r2_column = next((col for col in ('R²', 'R2') if col in results_df), None)
+        if r2_column is not None and results_df[r2_column].notna().any():
+            best = results_df.loc[results_df[r2_column].idxmax(), 'Model']
+            if best in self.models:
+                self.serve_models = [best]
+                return
+        self.serve_models = list(self.models)
+
     def adjusted_r2(self, r2, n, p):
         """Compute Adjusted R²"""
         return 1 - (1 - r2) * (n - 1) / (n - p - 1)
 
-    def train_model(self):
+    def train_model(self, plot=False):
         """Train multiple models and compare their performance"""
         print("🔄 Generating and preparing training data...")
-        data = self.prepare_data()
-        X = data.drop('premium', axis=1)
-        y = data['premium']
+        features, y = self.prepare_data()
+        # Stack the column arrays once into the feature matrix, in FEATURE_COLUMNS order
+        X = np.column_stack([
+            self.encode_column(col, features[col]) if col in self._cats else features[col]
+            for col in FEATURE_COLUMNS
+        ]).astype(np.float32)
 
-        X_processed = self.preprocess_features(X)
         self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X_processed)
+        # Trees and boosters don't need float64; float32 halves the memory traffic
+        X_scaled = np.ascontiguousarray(self.scaler.fit_transform(X), dtype=np.float32)
+        self._cache_scaler()
+
+        # 80/20 split by slicing one seeded permutation
+        idx = np.random.default_rng(42).permutation(len(y))
+        split = int(0.8 * len(y))
+        X_train, X_test = X_scaled[idx[:split]], X_scaled[idx[split:]]
+        y_train, y_test = y[idx[:split]], y[idx[split:]]
 
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+        # Models train concurrently, so the multithreaded ones split the cores between them
+        threads_per_model = max(1, (os.cpu_count() or 1) // len(MODEL_NAMES))
 
         # Define multiple models
         model_dict = {
             "LinearRegression": LinearRegression(),
             "DecisionTree": DecisionTreeRegressor(max_depth=10, random_state=42),
-            "RandomForest": RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1),
-            "XGBoost": XGBRegressor(n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42)
+            "RandomForest": RandomForestRegressor(
+                n_estimators=100, max_depth=10, random_state=42, n_jobs=threads_per_model
+            ),
+            "HistGradientBoosting": HistGradientBoostingRegressor(
+                max_iter=200, max_depth=8, learning_rate=0.1, random_state=42
+            ),
+            "XGBoost": XGBRegressor(
+                n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42,
+                tree_method="hist", device=xgb_device(), n_jobs=threads_per_model,
+                early_stopping_rounds=20
+            )
         }
 
         results = []
 
-        print("\n⚙️ Training Models and Evaluating Performance...")
-        for name, model in model_dict.items():
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-
-            # Compute metrics
-            mae = mean_absolute_error(y_test, y_pred)
-            mse = mean_squared_error(y_test, y_pred)
-            rmse = np.sqrt(mse)
-            mape = mean_absolute_percentage_error(y_test, y_pred) * 100
-            r2 = r2_score(y_test, y_pred)
-            adj_r2 = self.adjusted_r2(r2, len(y_test), X_test.shape[1])
+        print(f"\n⚙️ Training Models and Evaluating Performance (XGBoost on {xgb_device()})...")
+        # The learners do their work in native code that releases the GIL, so threads overlap them
+        fitted = Parallel(n_jobs=len(model_dict), prefer='threads')(
+            delayed(self._fit_eval)(name, model, X_train, y_train, X_test, y_test)
+            for name, model in model_dict.items()
+        )
 
+        for name, model, (mae, mse, rmse, mape, r2, adj_r2) in fitted:
             results.append((name, mae, mse, rmse, mape, r2, adj_r2))
 
             self.models[name] = model
-            joblib.dump(model, f'models/{name}.pkl')
+            joblib.dump(model, f'models/{name}.pkl', compress=COMPRESS, protocol=5)
+            self._compile_treelite(name, model)
 
             print(
                 f"✅ {name} → MAE: {mae:.2f}, RMSE: {rmse:.2f}, MAPE: {mape:.2f}%, "
@@ -140,23 +299,30 @@ class InsurancePremiumPredictor:
             )
 
         # Save preprocessing
-        joblib.dump(self.scaler, 'models/scaler.pkl')
-        joblib.dump(self.label_encoders, 'models/label_encoders.pkl')
+        joblib.dump(self.scaler, 'models/scaler.pkl', compress=COMPRESS, protocol=5)
+        self._load_compiled()
 
         print("\n📦 All models and preprocessing files saved successfully!")
 
         # Create comparison DataFrame
         results_df = pd.DataFrame(results, columns=['Model', 'MAE', 'MSE', 'RMSE', 'MAPE(%)', 'R²', 'Adjusted R²'])
         print("\n📊 Model Comparison:\n", results_df)
+        results_df.to_csv(PERFORMANCE_PATH, index=False)
+        self._select_serve_models(results_df)
+        print(f"🚀 Serving predictions with {', '.join(self.serve_models)}")
 
-        # Plot metrics comparison
-        self.plot_model_comparison(results_df)
+        if plot:
+            # Plot metrics comparison
+            self.plot_model_comparison(results_df)
 
-        # Plot feature relations
-        self.plot_feature_relations(data)
+            # Plot feature relations
+            self.plot_feature_relations(features, y)
 
     def plot_model_comparison(self, results_df):
-        """Plot all metrics comparison for trained models"""
+        """Plot all metrics comparison for trained models to models/model_comparison.png"""
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
         metrics = ['MAE', 'RMSE', 'MAPE(%)', 'R²', 'Adjusted R²']
         colors = ['#FF9999', '#66B2FF', '#99FF99', '#FFD580', '#C2C2F0']
 
@@ -176,71 +342,107 @@ class InsurancePremiumPredictor:
 
         plt.tight_layout()
         plt.suptitle('📊 Model Performance Comparison', fontsize=16, y=1.03)
-        plt.show()
+        plt.savefig('models/model_comparison.png', bbox_inches='tight')
+        plt.close()
+
+    def plot_feature_relations(self, features, premiums):
+        """Plot relationships between features and premium to models/feature_relations.png"""
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
 
-    def plot_feature_relations(self, data):
-        """Plot relationships between features and premium"""
-        features = ['age', 'bmi', 'children']
         plt.figure(figsize=(15, 4))
-        for i, feature in enumerate(features):
+        for i, feature in enumerate(['age', 'bmi', 'children']):
             plt.subplot(1, 3, i + 1)
-            plt.scatter(data[feature], data['premium'], alpha=0.6, color='teal')
+            plt.scatter(features[feature], premiums, alpha=0.6, color='teal')
             plt.title(f'{feature} vs Premium')
             plt.xlabel(feature)
             plt.ylabel('Premium')
             plt.grid(True, linestyle='--', alpha=0.6)
         plt.tight_layout()
         plt.suptitle("📈 Feature vs Premium Relationships", fontsize=15, y=1.02)
-        plt.show()
+        plt.savefig('models/feature_relations.png', bbox_inches='tight')
+        plt.close()
 
     def load_model(self):
         """Load trained models and preprocessing files"""
         try:
             self.models = {}
-            for name in ["LinearRegression", "DecisionTree", "RandomForest", "XGBoost"]:
+            for name in MODEL_NAMES:
                 model_path = f"models/{name}.pkl"
                 if os.path.exists(model_path):
                     self.models[name] = joblib.load(model_path)
             self.scaler = joblib.load('models/scaler.pkl')
-            self.label_encoders = joblib.load('models/label_encoders.pkl')
+            self._cache_scaler()
+            self._load_compiled()
+            self._select_serve_models()
             print("✅ All models loaded successfully!")
         except FileNotFoundError:
             print("⚠️ No models found. Training new models...")
             self.train_model()
 
-    def predict(self, age, gender, bmi, children, smoker, region):
-        """Predict premiums using all trained models"""
+    def predict(self, age, gender, bmi, children, smoker, region, all_models=False):
+        """Predict premiums with the served model, or every trained model if all_models"""
         if not self.models:
             self.load_model()
 
-        input_data = pd.DataFrame({
-            'age': [age],
-            'gender': [gender],
-            'bmi': [bmi],
-            'children': [children],
-            'smoker': [smoker],
-            'region': [region]
-        })
-
-        input_processed = self.preprocess_features(input_data)
-        input_scaled = self.scaler.transform(input_processed)
+        # Encode straight into this thread's scratch row and scale it in place
+        # with the cached float32 statistics, skipping DataFrame construction
+        # and sklearn input validation
+        input_scaled = getattr(self._buffers, 'row', None)
+        if input_scaled is None:
+            input_scaled = self._buffers.row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float32)
+        try:
+            input_scaled[0] = (
+                age, self._codes['gender'][gender], bmi, children,
+                self._codes['smoker'][smoker], self._codes['region'][region]
+            )
+        except KeyError as e:
+            raise ValueError(f"Unknown category {e}") from None
+        np.subtract(input_scaled, self._mean, out=input_scaled)
+        np.divide(input_scaled, self._scale, out=input_scaled)
 
         predictions = {}
-        for name, model in self.models.items():
-            pred = model.predict(input_scaled)[0]
-            predictions[name] = round(pred, 2)
+        for name in (self.models if all_models else self.serve_models):
+            pred = self._model_predict(name, input_scaled)[0]
+            predictions[name] = round(float(pred), 2)
 
         return predictions
 
+    def predict_batch(self, samples, all_models=False):
+        """Predict premiums for many rows, returning arrays per model (see predict)"""
+        if not self.models:
+            self.load_model()
+        names = list(self.models) if all_models else self.serve_models
+
+        input_data = pd.DataFrame(samples, columns=FEATURE_COLUMNS)
+        raw = self.preprocess_features(input_data).to_numpy(dtype=np.float32)
+        input_scaled = (raw - self._mean) / self._scale
+
+        if len(input_scaled) <= PARALLEL_PREDICT_THRESHOLD:
+            return {name: np.round(self._model_predict(name, input_scaled), 2) for name in names}
+
+        # Tree models and XGBoost release the GIL, so threads overlap the chunks
+        chunks = np.array_split(input_scaled, os.cpu_count() or 1)
+        results = Parallel(n_jobs=-1, prefer='threads')(
+            delayed(self._model_predict)(name, chunk) for name in names for chunk in chunks
+        )
+        n_chunks = len(chunks)
+        return {
+            name: np.round(np.concatenate(results[i * n_chunks:(i + 1) * n_chunks]), 2)
+            for i, name in enumerate(names)
+        }
+
 
 # -------------------------------------------------------
 # STANDALONE TEST
 # -------------------------------------------------------
 if __name__ == "__main__":
     predictor = InsurancePremiumPredictor()
-    predictor.train_model()
+    predictor.train_model(plot=True)
 
-    results = predictor.predict(age=35, gender='male', bmi=27.5, children=2, smoker='no', region='northwest')
+    results = predictor.predict(
+        age=35, gender='male', bmi=27.5, children=2, smoker='no', region='northwest', all_models=True
+    )
     print("\n🔍 Prediction Results:")
     for model, value in results.items():
         print(f"{model}: ₹{value}")
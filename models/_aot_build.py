@@ -0,0 +1,19 @@
+"""
+Ahead-of-time compile the premium kernel into models/premium_aot.
+
+Run from the project root with: python -m models._aot_build
+"""
+
+import os
+
+from numba.pycc import CC
+
+from models._premium_kernel import AOT_SIGNATURE, _compute_premium
+
+cc = CC('premium_aot')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export('compute_premium', AOT_SIGNATURE)(_compute_premium)
+
+if __name__ == '__main__':
+    cc.compile()
+    print(f"Compiled premium_aot into {cc.output_dir}")
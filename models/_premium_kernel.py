@@ -0,0 +1,58 @@
+"""
+Compiled premium formula shared by the synthetic data generators
+(data/sample_data.py and both prepare_data implementations).
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional, fall back to plain Python
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
+
+# Region order used for the integer region codes
+REGIONS = np.array(['northeast', 'southeast', 'southwest', 'northwest'])
+REGION_MULT = np.array([1.1, 0.9, 0.95, 1.05])
+
+
+def _compute_premium(age, bmi, children, smoker, male, region_idx,
+                     noise_smoker, noise_all, male_loading, min_premium, out):
+    """Write the premium for every sample into the preallocated `out` array.
+
+    `smoker` and `male` are int8 masks, `region_idx` indexes REGION_MULT.
+    """
+    for i in prange(age.shape[0]):
+        premium = 5000.0 + (age[i] - 18) * 50.0
+
+        if bmi[i] > 30:
+            premium += (bmi[i] - 30) * 200
+        elif bmi[i] < 18.5:
+            premium += (18.5 - bmi[i]) * 100
+
+        if smoker[i]:
+            premium += 15000 + noise_smoker[i]
+
+        premium += children[i] * 1000
+
+        if male[i]:
+            premium += male_loading
+
+        premium *= REGION_MULT[region_idx[i]]
+        premium += noise_all[i]
+        out[i] = max(premium, min_premium)
+    return out
+
+
+# AOT signature used by models/_aot_build.py
+AOT_SIGNATURE = 'f8[:](i4[:], f8[:], i4[:], i1[:], i1[:], i1[:], f8[:], f8[:], f8, f8, f8[:])'
+
+try:
+    # Prebuilt by `python -m models._aot_build`, avoids first-call JIT latency
+    from models.premium_aot import compute_premium
+except ImportError:
+    compute_premium = njit(parallel=True, cache=True, fastmath=True)(_compute_premium)
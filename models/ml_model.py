@@ -1,74 +1,67 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
 import os
+import threading
+from functools import lru_cache
+from models._premium_kernel import REGIONS, compute_premium
+
+FEATURE_COLUMNS = ['age', 'gender', 'bmi', 'children', 'smoker', 'region']
+AGE_IDX, BMI_IDX, CHILDREN_IDX = (FEATURE_COLUMNS.index(col) for col in ('age', 'bmi', 'children'))
+SCALER_ARRAY_PATH = 'models/scaler.npy'
 
 class InsurancePremiumPredictor:
+    # Known categories, sorted so the codes match the old LabelEncoder ones
+    _cats = {
+        'gender': np.array(['female', 'male']),
+        'smoker': np.array(['no', 'yes']),
+        'region': np.array(['northeast', 'northwest', 'southeast', 'southwest'])
+    }
+    
     def __init__(self):
         self.model = None
         self.scaler = None
-        self.label_encoders = {}
+        self._scaler_mean = None
+        self._scaler_scale = None
+        self._encoded_rows = {}
+        # Per-thread (1, n_features) input row reused by predict()
+        self._buffers = threading.local()
         
     def prepare_data(self):
         """Generate sample insurance data for training"""
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         n_samples = 1000
         
         # Generate synthetic data
-        ages = np.random.randint(18, 65, n_samples)
-        genders = np.random.choice(['male', 'female'], n_samples)
-        bmis = np.random.normal(28, 6, n_samples)
-        bmis = np.clip(bmis, 15, 50)  # Realistic BMI range
-        children = np.random.poisson(1, n_samples)
-        children = np.clip(children, 0, 5)
-        smokers = np.random.choice(['yes', 'no'], n_samples, p=[0.2, 0.8])
-        regions = np.random.choice(['northeast', 'southeast', 'southwest', 'northwest'], n_samples)
-        
-        # Create premium based on realistic factors
-        base_premium = 5000
-        premiums = []
-        
-        for i in range(n_samples):
-            premium = base_premium
-            
-            # Age factor
-            premium += (ages[i] - 18) * 50
-            
-            # BMI factor
-            if bmis[i] > 30:
-                premium += (bmis[i] - 30) * 200
-            elif bmis[i] < 18.5:
-                premium += (18.5 - bmis[i]) * 100
-                
-            # Smoking factor
-            if smokers[i] == 'yes':
-                premium += 15000
-                
-            # Children factor
-            premium += children[i] * 1000
-            
-            # Gender factor (slight difference)
-            if genders[i] == 'male':
-                premium += 500
-                
-            # Region factor
-            region_multipliers = {
-                'northeast': 1.1,
-                'southeast': 0.9,
-                'southwest': 0.95,
-                'northwest': 1.05
-            }
-            premium *= region_multipliers[regions[i]]
-            
-            # Add some noise
-            premium += np.random.normal(0, 1000)
-            premium = max(premium, 1000)  # Minimum premium
-            
-            premiums.append(premium)
+        ages = rng.integers(18, 65, n_samples, dtype=np.int32)
+        genders = rng.choice(['male', 'female'], n_samples)
+        # Scale and clip the draws in place rather than allocating new arrays
+        bmis = rng.standard_normal(n_samples)
+        bmis *= 6
+        bmis += 28
+        np.clip(bmis, 15, 50, out=bmis)  # Realistic BMI range
+        children = rng.poisson(1, n_samples).astype(np.int32)
+        np.clip(children, 0, 5, out=children)
+        smokers = rng.choice(['yes', 'no'], n_samples, p=[0.2, 0.8])
+        # Regions are drawn as int8 codes into REGIONS; the names only exist for the DataFrame
+        region_idx = rng.integers(0, len(REGIONS), n_samples, dtype=np.int8)
+        regions = REGIONS[region_idx]
+        
+        # Create premium based on realistic factors (base, age, BMI, smoking,
+        # children, gender loading of 500, region multiplier, noise, 1000 floor)
+        noise = rng.standard_normal(n_samples)
+        noise *= 1000
+        premiums = np.empty(n_samples, dtype=np.float64)
+        compute_premium(
+            ages, bmis, children,
+            (smokers == 'yes').astype(np.int8),
+            (genders == 'male').astype(np.int8),
+            region_idx, np.zeros(n_samples), noise,
+            500.0, 1000.0, premiums
+        )
         
         # Create DataFrame
         data = pd.DataFrame({
@@ -83,23 +76,60 @@ class InsurancePremiumPredictor:
         
         return data
     
+    def encode_column(self, col, values):
+        """Map category strings to their int8 codes, rejecting unknown values"""
+        cats = self._cats[col]
+        values = np.asarray(values, dtype=str)
+        codes = np.searchsorted(cats, values)
+        if not np.array_equal(cats[np.minimum(codes, len(cats) - 1)], values):
+            raise ValueError(f"Unknown {col} value in {np.setdiff1d(values, cats)}")
+        return codes.astype(np.int8)
+    
     def preprocess_features(self, data):
         """Preprocess features for training"""
         # Create a copy to avoid modifying original data
         processed_data = data.copy()
         
-        # Encode categorical variables
-        categorical_columns = ['gender', 'smoker', 'region']
-        
-        for col in categorical_columns:
-            if col not in self.label_encoders:
-                self.label_encoders[col] = LabelEncoder()
-                processed_data[col] = self.label_encoders[col].fit_transform(processed_data[col])
-            else:
-                processed_data[col] = self.label_encoders[col].transform(processed_data[col])
+        # Encode categorical variables against the fixed category arrays
+        for col in self._cats:
+            processed_data[col] = self.encode_column(col, data[col].values)
         
         return processed_data
     
+    def _save_scaler_arrays(self, scaler):
+        """Persist the fitted scaler's mean/scale as a single float32 array"""
+        arrays = np.stack([scaler.mean_, scaler.scale_]).astype(np.float32)
+        np.save(SCALER_ARRAY_PATH, arrays)
+        self._scaler_mean, self._scaler_scale = arrays[0], arrays[1]
+    
+    def _load_scaler_arrays(self):
+        """Memory-map the scaler arrays, migrating from scaler.pkl if needed"""
+        if os.path.exists(SCALER_ARRAY_PATH):
+            arrays = np.load(SCALER_ARRAY_PATH, mmap_mode='r')
+            self._scaler_mean, self._scaler_scale = arrays[0], arrays[1]
+        else:
+            self._save_scaler_arrays(joblib.load('models/scaler.pkl'))
+    
+    def _scale(self, features):
+        """Standardize features as (x - mean) / scale"""
+        return (np.asarray(features, dtype=np.float32) - self._scaler_mean) / self._scaler_scale
+    
+    def _build_encoded_rows(self):
+        """Precompute a scaled feature row for every (gender, smoker, region)"""
+        codes = {
+            col: {value: code for code, value in enumerate(cats)}
+            for col, cats in self._cats.items()
+        }
+        self._encoded_rows = {}
+        for gender, gender_code in codes['gender'].items():
+            for smoker, smoker_code in codes['smoker'].items():
+                for region, region_code in codes['region'].items():
+                    raw = np.zeros(len(FEATURE_COLUMNS), dtype=np.float32)
+                    raw[FEATURE_COLUMNS.index('gender')] = gender_code
+                    raw[FEATURE_COLUMNS.index('smoker')] = smoker_code
+                    raw[FEATURE_COLUMNS.index('region')] = region_code
+                    self._encoded_rows[(gender, smoker, region)] = self._scale(raw)
+    
     def train_model(self):
         """Train the insurance premium prediction model"""
         print("Generating training data...")
@@ -111,19 +141,20 @@ class InsurancePremiumPredictor:
         
         # Separate features and target
         X = data.drop('premium', axis=1)
-        y = data['premium']
+        y = data['premium'].to_numpy()
         
         # Preprocess features
         X_processed = self.preprocess_features(X)
         
         # Scale numerical features
         self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X_processed)
+        X_scaled = np.ascontiguousarray(self.scaler.fit_transform(X_processed), dtype=np.float32)
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y, test_size=0.2, random_state=42
-        )
+        # Split data 80/20 by slicing one seeded permutation
+        idx = np.random.default_rng(42).permutation(len(y))
+        split = int(0.8 * len(y))
+        X_train, X_test = X_scaled[idx[:split]], X_scaled[idx[split:]]
+        y_train, y_test = y[idx[:split]], y[idx[split:]]
         
         # Train model
         print("Training Random Forest model...")
@@ -153,7 +184,8 @@ class InsurancePremiumPredictor:
         os.makedirs('models', exist_ok=True)
         joblib.dump(self.model, 'models/insurance_model.pkl')
         joblib.dump(self.scaler, 'models/scaler.pkl')
-        joblib.dump(self.label_encoders, 'models/label_encoders.pkl')
+        self._save_scaler_arrays(self.scaler)
+        self._build_encoded_rows()
         
         print("Model saved successfully!")
         
@@ -161,8 +193,8 @@ class InsurancePremiumPredictor:
         """Load trained model"""
         try:
             self.model = joblib.load('models/insurance_model.pkl')
-            self.scaler = joblib.load('models/scaler.pkl')
-            self.label_encoders = joblib.load('models/label_encoders.pkl')
+            self._load_scaler_arrays()
+            self._build_encoded_rows()
             print("Model loaded successfully!")
         except FileNotFoundError:
             print("Model files not found. Training new model...")
@@ -173,24 +205,62 @@ class InsurancePremiumPredictor:
         if self.model is None:
             self.load_model()
         
-        # Create input DataFrame
-        input_data = pd.DataFrame({
-            'age': [age],
-            'gender': [gender],
-            'bmi': [bmi],
-            'children': [children],
-            'smoker': [smoker],
-            'region': [region]
-        })
+        # Categorical features come pre-encoded and pre-scaled from the lookup
+        encoded = self._encoded_rows.get((gender, smoker, region))
+        if encoded is None:
+            raise ValueError(f"Unknown category in {(gender, smoker, region)}")
         
-        # Preprocess input
-        input_processed = self.preprocess_features(input_data)
-        input_scaled = self.scaler.transform(input_processed)
+        # Fill the thread's input row in place: the encoded categoricals,
+        # then the scaled numeric features
+        input_scaled = getattr(self._buffers, 'row', None)
+        if input_scaled is None:
+            input_scaled = self._buffers.row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float32)
+        row = input_scaled[0]
+        row[:] = encoded
+        for idx, value in ((AGE_IDX, age), (BMI_IDX, bmi), (CHILDREN_IDX, children)):
+            row[idx] = (float(value) - self._scaler_mean[idx]) / self._scaler_scale[idx]
         
         # Make prediction
         prediction = self.model.predict(input_scaled)[0]
         
         return round(prediction, 2)
+    
+    def predict_batch(self, samples):
+        """Make predictions for a list of input dicts in a single model call"""
+        if self.model is None:
+            self.load_model()
+        
+        input_data = pd.DataFrame(samples, columns=FEATURE_COLUMNS)
+        input_processed = self.preprocess_features(input_data)
+        input_scaled = self._scale(input_processed)
+        
+        predictions = self.model.predict(input_scaled)
+        
+        return [round(float(p), 2) for p in predictions]
+
+# Shared predictor, loaded on first use
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """Return the process-wide predictor, loading the model on first call"""
+    global _predictor
+    if _predictor is None:
+        # Threads racing on the first request must not each unpickle the model
+        with _predictor_lock:
+            if _predictor is None:
+                predictor = InsurancePremiumPredictor()
+                predictor.load_model()
+                _predictor = predictor
+    return _predictor
+
+@lru_cache(maxsize=4096)
+def _predict_cached(age, gender, bmi, children, smoker, region):
+    return get_predictor().predict(age, gender, bmi, children, smoker, region)
+
+def predict_cached(age, gender, bmi, children, smoker, region):
+    """Memoized prediction; BMI is rounded to the form's 0.1 precision"""
+    return _predict_cached(int(age), gender, round(float(bmi), 1), int(children), smoker, region)
 
 # Example usage and testing
 if __name__ == "__main__":
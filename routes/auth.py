@@ -1,10 +1,15 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, flash
+from utils.cached_flask import cached_url_for as url_for
 from flask_login import login_user, logout_user, current_user
-from database.db_manager import create_user, get_user_by_username, verify_password, get_user_by_email
+from database.db_manager import create_user, get_user_by_username, verify_password, check_user_exists
 import re
 
 auth_bp = Blueprint('auth', __name__)
 
+# Registration field patterns, compiled once at import
+USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
+EMAIL_RE = re.compile(r'^[^@]+@[^@]+\.[^@]+$')
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """User login route"""
@@ -63,10 +68,10 @@ def register():
         if not username or len(username) < 3:
             errors.append('Username must be at least 3 characters long.')
         
-        if not re.match(r'^[a-zA-Z0-9_]+$', username):
+        if not USERNAME_RE.match(username):
             errors.append('Username can only contain letters, numbers, and underscores.')
         
-        if not email or not re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
+        if not email or not EMAIL_RE.match(email):
             errors.append('Please enter a valid email address.')
         
         if not password or len(password) < 6:
@@ -76,10 +81,11 @@ def register():
             errors.append('Passwords do not match.')
         
         # Check if username or email already exists
-        if get_user_by_username(username):
+        username_taken, email_taken = check_user_exists(username, email)
+        if username_taken:
             errors.append('Username already exists.')
         
-        if get_user_by_email(email):
+        if email_taken:
             errors.append('Email already registered.')
         
         if errors:
@@ -1,10 +1,29 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import json
+import logging
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
-from database.db_manager import get_user_predictions, save_prediction
-from models.ml_model import InsurancePremiumPredictor
+from database.db_manager import get_user_predictions, get_user_stats, save_prediction, save_prediction_and_wait
+from models.ml_model import predict_cached
+from utils.helpers import rate_limit, validate_prediction_inputs
+
+log = logging.getLogger(__name__)
 
 user_bp = Blueprint('user', __name__)
 
+# Chatbot bodies encoded once at import; only the echoed message is encoded per request
+_CHATBOT_ADMIN_ERROR = json.dumps({'error': 'Admin users cannot use chatbot'})
+_CHATBOT_EMPTY_REPLY = json.dumps({"reply": "Please enter a valid message."})
+_CHATBOT_ERROR = json.dumps({"error": "Something went wrong"})
+
+# api_predict bodies; the success body is filled per request from an immutable template
+_PREDICT_ADMIN_ERROR = json.dumps({'error': 'Admin users cannot make predictions'})
+_PREDICT_ERROR = json.dumps({'error': 'Prediction failed'})
+_PREDICT_SUCCESS = '{"success": true, "prediction": %s, "formatted_prediction": "$%s"}'
+
+def _json_body(body, status=200):
+    """Response for an already-encoded JSON body"""
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
 @user_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -27,10 +46,7 @@ def history():
     # Get all predictions for the user (increased limit)
     predictions = get_user_predictions(current_user.id, limit=100)
     
-    # Debug: Print predictions to console
-    print(f"User {current_user.id} has {len(predictions)} predictions")
-    for pred in predictions[:3]:  # Print first 3 for debugging
-        print(f"Prediction: {dict(pred)}")
+    log.debug("User %s has %d predictions", current_user.id, len(predictions))
     
     return render_template('history.html', predictions=predictions)
 
@@ -43,63 +59,46 @@ def predict():
     
     if request.method == 'POST':
         try:
-            # Get form data
-            age = int(request.form['age'])
-            gender = request.form['gender']
-            bmi = float(request.form['bmi'])
-            children = int(request.form['children'])
-            smoker = request.form['smoker']
-            region = request.form['region']
-            
-            # Validate inputs
-            if not (18 <= age <= 100):
-                flash('Age must be between 18 and 100.', 'error')
-                return render_template('predict.html')
-            
-            if not (10 <= bmi <= 50):
-                flash('BMI must be between 10 and 50.', 'error')
+            # Validate all form fields at once and render a single error page
+            data = request.form.to_dict()
+            valid, errors = validate_prediction_inputs(data)
+            if not valid:
+                for error in errors:
+                    flash(error, 'error')
                 return render_template('predict.html')
             
-            if not (0 <= children <= 10):
-                flash('Number of children must be between 0 and 10.', 'error')
-                return render_template('predict.html')
-            
-            if gender not in ['male', 'female']:
-                flash('Please select a valid gender.', 'error')
-                return render_template('predict.html')
-            
-            if smoker not in ['yes', 'no']:
-                flash('Please select smoking status.', 'error')
-                return render_template('predict.html')
-            
-            if region not in ['northeast', 'southeast', 'southwest', 'northwest']:
-                flash('Please select a valid region.', 'error')
-                return render_template('predict.html')
+            age = int(data['age'])
+            gender = data['gender']
+            bmi = float(data['bmi'])
+            children = int(data.get('children', 0))
+            smoker = data['smoker']
+            region = data['region']
             
-            # Make prediction
-            predictor = InsurancePremiumPredictor()
-            prediction = predictor.predict(age, gender, bmi, children, smoker, region)
+            # Make prediction (repeat submissions are served from the cache)
+            prediction = predict_cached(age, gender, bmi, children, smoker, region)
             
-            # Save prediction to database
-            save_prediction(current_user.id, age, gender, bmi, children, smoker, region, prediction)
+            # Save prediction to database, committed before the dashboard reads it back
+            if save_prediction_and_wait(current_user.id, age, gender, bmi, children, smoker, region, prediction) is None:
+                flash('Your prediction could not be saved to your history.', 'warning')
             
             flash(f'Predicted Insurance Premium: ${prediction:,.2f}', 'success')
             return redirect(url_for('user.dashboard'))
             
         except ValueError as e:
             flash('Please enter valid numerical values.', 'error')
-        except Exception as e:
+        except Exception:
             flash('An error occurred during prediction. Please try again.', 'error')
-            print(f"Prediction error: {e}")  # For debugging
+            log.exception("Prediction failed")
     
     return render_template('predict.html')
 
 @user_bp.route('/api/predict', methods=['POST'])
 @login_required
+@rate_limit(max_requests=30, window=60)
 def api_predict():
     """API endpoint for prediction (AJAX)"""
     if current_user.is_admin:
-        return jsonify({'error': 'Admin users cannot make predictions'}), 403
+        return _json_body(_PREDICT_ADMIN_ERROR, 403)
     
     try:
         data = request.get_json()
@@ -110,9 +109,8 @@ def api_predict():
             if field not in data:
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        # Make prediction
-        predictor = InsurancePremiumPredictor()
-        prediction = predictor.predict(
+        # Make prediction (repeat submissions are served from the cache)
+        prediction = predict_cached(
             data['age'], data['gender'], data['bmi'],
             data['children'], data['smoker'], data['region']
         )
@@ -123,15 +121,12 @@ def api_predict():
             data['children'], data['smoker'], data['region'], prediction
         )
         
-        return jsonify({
-            'success': True,
-            'prediction': prediction,
-            'formatted_prediction': f'${prediction:,.2f}'
-        })
+        # The formatted amount is only digits, ',', '.' and '-', so needs no escaping
+        return _json_body(_PREDICT_SUCCESS % (json.dumps(float(prediction)), f'{prediction:,.2f}'))
         
-    except Exception as e:
-        print(f"API Prediction error: {e}")
-        return jsonify({'error': 'Prediction failed'}), 500
+    except Exception:
+        log.exception("API prediction failed")
+        return _json_body(_PREDICT_ERROR, 500)
 
 @user_bp.route('/profile')
 @login_required
@@ -140,13 +135,13 @@ def profile():
     if current_user.is_admin:
         return redirect(url_for('admin.dashboard'))
     
-    # Get user statistics
-    predictions = get_user_predictions(current_user.id, limit=1000)  # Get all predictions
+    # Get user statistics, aggregated in SQL
+    total, avg_premium, latest = get_user_stats(current_user.id)
     
     stats = {
-        'total_predictions': len(predictions),
-        'avg_premium': sum([p['predicted_premium'] for p in predictions]) / len(predictions) if predictions else 0,
-        'latest_prediction': predictions[0] if predictions else None
+        'total_predictions': total,
+        'avg_premium': avg_premium,
+        'latest_prediction': latest
     }
     
     return render_template('profile.html', stats=stats)
@@ -154,23 +149,24 @@ def profile():
 # ✅ New Chatbot API
 @user_bp.route('/chatbot_api', methods=['POST'])
 @login_required
+@rate_limit(max_requests=30, window=60)
 def chatbot_api():
     """Simple chatbot API endpoint"""
     if current_user.is_admin:
-        return jsonify({'error': 'Admin users cannot use chatbot'}), 403
+        return _json_body(_CHATBOT_ADMIN_ERROR, 403)
 
     try:
         data = request.get_json()
         user_message = data.get("message", "").strip()
 
         if not user_message:
-            return jsonify({"reply": "Please enter a valid message."}), 400
+            return _json_body(_CHATBOT_EMPTY_REPLY, 400)
 
         # 🔹 Simple mock chatbot response (can be extended later)
         reply = f"You said: {user_message}"
 
-        return jsonify({"reply": reply})
+        return _json_body('{"reply": ' + current_app.json.dumps(reply) + '}')
     
-    except Exception as e:
-        print(f"Chatbot error: {e}")
-        return jsonify({"error": "Something went wrong"}), 500
+    except Exception:
+        log.exception("Chatbot request failed")
+        return _json_body(_CHATBOT_ERROR, 500)
@@ -0,0 +1,30 @@
+"""
+Compiled numeric kernels for the report helpers in utils/helpers.py.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
+
+
+@njit(cache=True)
+def threshold_codes(values, thresholds):
+    """Category code per value: the number of ascending `thresholds` it is >= to"""
+    codes = np.empty(values.size, dtype=np.int8)
+    for i in range(values.size):
+        code = 0
+        while code < thresholds.size and values[i] >= thresholds[code]:
+            code += 1
+        codes[i] = code
+    return codes
+
+
+def warm_up():
+    """Compile (or load from the on-disk cache) every kernel before serving"""
+    threshold_codes(np.zeros(1), np.zeros(1))
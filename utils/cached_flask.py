@@ -0,0 +1,23 @@
+from functools import lru_cache
+from flask import url_for, request, has_request_context
+
+@lru_cache(maxsize=4096)
+def _cached_url_for(endpoint, host_url, script_root, blueprint, values):
+    return url_for(endpoint, **dict(values))
+
+def cached_url_for(endpoint, **values):
+    """Memoized url_for for the redirect-heavy blueprints.
+
+    The cache key includes everything url_for reads from the current request
+    (host, script root and blueprint for '.endpoint' names), so cached URLs
+    are the same ones url_for would build.
+    """
+    if not has_request_context():
+        return url_for(endpoint, **values)
+    try:
+        return _cached_url_for(
+            endpoint, request.host_url, request.script_root, request.blueprint,
+            frozenset(values.items())
+        )
+    except TypeError:  # unhashable values can't be cached
+        return url_for(endpoint, **values)
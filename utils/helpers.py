@@ -2,12 +2,29 @@
 Utility helper functions for the Medical Insurance Premium Prediction application.
 """
 
-import re
+import logging
+import string
+from bisect import bisect_right
+import threading
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-import sqlite3
-from flask import flash, request, current_app
+import numpy as np
+from flask import flash, request, current_app, jsonify
 from flask_login import current_user
+from database.db_manager import get_db_connection, invalidate_analytics_cache
+from utils._numeric import threshold_codes
+
+log = logging.getLogger(__name__)
+
+# Character classes of the old ^[a-zA-Z0-9_]+$ and
+# ^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$ patterns, checked with set
+# operations instead of running the regex engine
+_ASCII_LETTERS = frozenset(string.ascii_letters)
+_USERNAME_CHARS = _ASCII_LETTERS | frozenset(string.digits + '_')
+_EMAIL_LOCAL_CHARS = _ASCII_LETTERS | frozenset(string.digits + '._%+-')
+_EMAIL_DOMAIN_CHARS = _ASCII_LETTERS | frozenset(string.digits + '.-')
 
 def validate_age(age):
     """Validate age input."""
@@ -33,8 +50,12 @@ def validate_bmi(bmi):
 
 def validate_email(email):
     """Validate email format."""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if re.match(pattern, email):
+    local, _, domain = email.partition('@')
+    host, _, tld = domain.rpartition('.')
+    if (local and host and len(tld) >= 2
+            and _EMAIL_LOCAL_CHARS.issuperset(local)
+            and _EMAIL_DOMAIN_CHARS.issuperset(host)
+            and _ASCII_LETTERS.issuperset(tld)):
         return True, email.lower()
     else:
         return False, "Invalid email format"
@@ -44,7 +65,7 @@ def validate_username(username):
     if len(username) < 3:
         return False, "Username must be at least 3 characters long"
     
-    if not re.match(r'^[a-zA-Z0-9_]+$', username):
+    if not _USERNAME_CHARS.issuperset(username):
         return False, "Username can only contain letters, numbers, and underscores"
     
     return True, username
@@ -60,16 +81,18 @@ def validate_password(password):
     
     return True, password
 
+# Category boundaries and (label, css class) per category, shared by the
+# scalar helpers (bisect) and the compiled batch categorization in generate_report_data
+BMI_THRESHOLDS = (18.5, 25.0, 30.0)
+BMI_CATEGORIES = (("Underweight", "info"), ("Normal weight", "success"),
+                  ("Overweight", "warning"), ("Obese", "danger"))
+RISK_THRESHOLDS = (5000.0, 10000.0, 20000.0)
+RISK_LEVELS = (("Low", "success"), ("Medium", "warning"),
+               ("High", "danger"), ("Very High", "dark"))
+
 def get_bmi_category(bmi):
     """Get BMI category based on value."""
-    if bmi < 18.5:
-        return "Underweight", "info"
-    elif bmi < 25:
-        return "Normal weight", "success"
-    elif bmi < 30:
-        return "Overweight", "warning"
-    else:
-        return "Obese", "danger"
+    return BMI_CATEGORIES[bisect_right(BMI_THRESHOLDS, bmi)]
 
 def format_currency(amount):
     """Format amount as currency."""
@@ -94,27 +117,37 @@ def calculate_bmi(height_cm, weight_kg):
 
 def get_premium_risk_level(premium):
     """Determine risk level based on premium amount."""
-    if premium < 5000:
-        return "Low", "success"
-    elif premium < 10000:
-        return "Medium", "warning"
-    elif premium < 20000:
-        return "High", "danger"
-    else:
-        return "Very High", "dark"
+    return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, premium)]
 
 def sanitize_input(input_string):
     """Sanitize user input to prevent XSS."""
     if not input_string:
         return ""
     
-    # Remove HTML tags
-    clean = re.sub('<.*?>', '', str(input_string))
-    
-    # Remove dangerous characters
-    clean = clean.replace('<', '&lt;').replace('>', '&gt;')
+    text = str(input_string)
+    if '<' not in text:
+        # No tags possible, only stray '>' need escaping
+        return text.replace('>', '&gt;').strip()
+    
+    # One scan from tag to tag: drop <...> spans (which don't cross a line
+    # break), escape any '<' or '>' left over
+    parts = []
+    pos = 0
+    while True:
+        start = text.find('<', pos)
+        if start == -1:
+            parts.append(text[pos:].replace('>', '&gt;'))
+            break
+        parts.append(text[pos:start].replace('>', '&gt;'))
+        end = text.find('>', start + 1)
+        newline = text.find('\n', start + 1)
+        if end != -1 and (newline == -1 or end < newline):
+            pos = end + 1
+        else:
+            parts.append('&lt;')
+            pos = start + 1
     
-    return clean.strip()
+    return ''.join(parts).strip()
 
 def log_user_activity(action, details=None):
     """Log user activity for audit purposes."""
@@ -134,7 +167,7 @@ def log_user_activity(action, details=None):
         
         # In a production environment, you might want to store this in a separate log file
         # or database table for security audit purposes
-        print(f"USER ACTIVITY: {log_entry}")
+        log.info("User activity: %s", log_entry)
 
 def require_admin(f):
     """Decorator to require admin privileges."""
@@ -146,24 +179,56 @@ def require_admin(f):
         return f(*args, **kwargs)
     return decorated_function
 
+RATE_LIMIT_SHARDS = 16
+RATE_LIMIT_KEYS_PER_SHARD = 4096
+
 def rate_limit(max_requests=10, window=60):
-    """Simple rate limiting decorator."""
+    """Token-bucket rate limiting decorator, per user (or client address).
+
+    Each key may burst up to `max_requests` and regains tokens at
+    max_requests / window per second; excess requests get a 429.
+    Buckets live in this process only.
+    """
+    refill_rate = max_requests / window
+    # key -> (tokens, last refill time); sharded so requests only contend per shard
+    shards = [OrderedDict() for _ in range(RATE_LIMIT_SHARDS)]
+    locks = [threading.Lock() for _ in range(RATE_LIMIT_SHARDS)]
+    
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # In a production environment, you would implement proper rate limiting
-            # using Redis or a similar store. This is a simplified version.
+            key = current_user.id if current_user.is_authenticated else request.remote_addr
+            shard_idx = hash(key) % RATE_LIMIT_SHARDS
+            buckets = shards[shard_idx]
+            now = time.monotonic()
+            
+            with locks[shard_idx]:
+                tokens, last = buckets.pop(key, (max_requests, now))
+                tokens = min(max_requests, tokens + (now - last) * refill_rate)
+                allowed = tokens >= 1
+                buckets[key] = (tokens - 1 if allowed else tokens, now)
+                # Bound memory by dropping the least recently seen key
+                if len(buckets) > RATE_LIMIT_KEYS_PER_SHARD:
+                    buckets.popitem(last=False)
+            
+            if not allowed:
+                return jsonify({'error': 'Too many requests, please slow down'}), 429
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
-def paginate_results(query_results, page=1, per_page=20):
-    """Paginate database query results."""
-    total = len(query_results)
+def paginate_results(count_fn, fetch_fn, page=1, per_page=20):
+    """Paginate database query results.
+
+    `count_fn()` returns the total row count and `fetch_fn(limit, offset)`
+    returns one page, so only `per_page` rows are ever loaded, e.g.
+    ``paginate_results(count_all_predictions, get_all_predictions, page)``
+    """
+    total = count_fn()
     start = (page - 1) * per_page
     end = start + per_page
     
-    items = query_results[start:end]
+    items = fetch_fn(limit=per_page, offset=start)
     
     has_prev = page > 1
     has_next = end < total
@@ -182,28 +247,43 @@ def paginate_results(query_results, page=1, per_page=20):
         'pages': (total + per_page - 1) // per_page
     }
 
-def export_to_csv(data, filename, headers=None):
-    """Export data to CSV format."""
+class _Echo:
+    """File-like object whose write() hands back the line instead of buffering it"""
+    def write(self, value):
+        return value
+
+def iter_csv(data, headers=None):
+    """Yield CSV lines one row at a time, for Response(iter_csv(rows), mimetype='text/csv').
+
+    `data` may be any iterable of dicts or sequences, e.g. iter_all_predictions().
+    """
     import csv
-    import io
+    from itertools import chain
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    writer = csv.writer(_Echo())
+    rows = iter(data)
     
     # Write headers
     if headers:
-        writer.writerow(headers)
-    elif data and isinstance(data[0], dict):
-        writer.writerow(data[0].keys())
+        yield writer.writerow(headers)
+    else:
+        first = next(rows, None)
+        if first is None:
+            return
+        rows = chain([first], rows)
+        if isinstance(first, dict):
+            yield writer.writerow(first.keys())
     
     # Write data
-    for row in data:
+    for row in rows:
         if isinstance(row, dict):
-            writer.writerow(row.values())
+            yield writer.writerow(row.values())
         else:
-            writer.writerow(row)
-    
-    return output.getvalue()
+            yield writer.writerow(row)
+
+def export_to_csv(data, filename, headers=None):
+    """Export data to CSV format (as one string, see iter_csv for streaming)."""
+    return ''.join(iter_csv(data, headers))
 
 def backup_database():
     """Create a backup of the SQLite database."""
@@ -231,6 +311,12 @@ def send_notification_email(to_email, subject, body):
     
     return True
 
+def _category_counts(values, thresholds, categories):
+    """Count values per category label, categorized in one compiled pass"""
+    codes = threshold_codes(values, np.asarray(thresholds, dtype=np.float64))
+    counts = np.bincount(codes, minlength=len(categories))
+    return {label: int(count) for (label, _), count in zip(categories, counts)}
+
 def generate_report_data(predictions):
     """Generate statistical report data from predictions."""
     if not predictions:
@@ -242,40 +328,41 @@ def generate_report_data(predictions):
     else:
         data = predictions
     
-    # Basic statistics
-    premiums = [p['predicted_premium'] for p in data]
-    ages = [p['age'] for p in data]
-    bmis = [p['bmi'] for p in data]
+    # Basic statistics over numpy columns
+    n = len(data)
+    premiums = np.fromiter((p['predicted_premium'] for p in data), dtype=np.float64, count=n)
+    ages = np.fromiter((p['age'] for p in data), dtype=np.int64, count=n)
+    bmis = np.fromiter((p['bmi'] for p in data), dtype=np.float64, count=n)
     
     report = {
-        'total_predictions': len(data),
+        'total_predictions': n,
         'premium_stats': {
-            'min': min(premiums),
-            'max': max(premiums),
-            'avg': sum(premiums) / len(premiums),
-            'median': sorted(premiums)[len(premiums)//2]
+            'min': float(premiums.min()),
+            'max': float(premiums.max()),
+            'avg': float(premiums.mean()),
+            # Upper median by linear-time selection rather than a full sort
+            'median': float(np.partition(premiums, n // 2)[n // 2])
         },
         'age_stats': {
-            'min': min(ages),
-            'max': max(ages),
-            'avg': sum(ages) / len(ages)
+            'min': int(ages.min()),
+            'max': int(ages.max()),
+            'avg': float(ages.mean())
         },
         'bmi_stats': {
-            'min': min(bmis),
-            'max': max(bmis),
-            'avg': sum(bmis) / len(bmis)
+            'min': float(bmis.min()),
+            'max': float(bmis.max()),
+            'avg': float(bmis.mean())
         },
         'smoker_distribution': {},
         'region_distribution': {},
-        'gender_distribution': {}
+        'gender_distribution': {},
+        'bmi_category_distribution': _category_counts(bmis, BMI_THRESHOLDS, BMI_CATEGORIES),
+        'risk_level_distribution': _category_counts(premiums, RISK_THRESHOLDS, RISK_LEVELS)
     }
     
-    # Distribution statistics
+    # Distribution statistics, counted in a single pass per category
     for category in ['smoker', 'region', 'gender']:
-        values = [p[category] for p in data]
-        unique_values = set(values)
-        distribution = {val: values.count(val) for val in unique_values}
-        report[f'{category}_distribution'] = distribution
+        report[f'{category}_distribution'] = dict(Counter(p[category] for p in data))
     
     return report
 
@@ -288,11 +375,9 @@ def get_system_health():
         'memory': 'healthy'
     }
     
-    # Database health check
+    # Database health check on the thread's cached connection
     try:
-        conn = sqlite3.connect('database.db')
-        conn.execute('SELECT 1')
-        conn.close()
+        get_db_connection().execute('SELECT 1').fetchone()
     except Exception:
         health['database'] = 'error'
     
@@ -315,22 +400,24 @@ def clean_old_predictions(days_old=365):
     """Clean up old prediction records."""
     cutoff_date = datetime.now() - timedelta(days=days_old)
     
+    # Shared WAL-mode connection; take the write lock up front for the bulk delete
+    conn = get_db_connection()
     try:
-        conn = sqlite3.connect('database.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.execute('''
             DELETE FROM predictions 
             WHERE created_at < ?
-        ''', (cutoff_date.isoformat(),))
+        ''', (cutoff_date.strftime('%Y-%m-%d %H:%M:%S'),))
         
         deleted_count = cursor.rowcount
         conn.commit()
-        conn.close()
-        
-        return True, f"Deleted {deleted_count} old prediction records"
     except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
         return False, str(e)
+    
+    invalidate_analytics_cache()
+    return True, f"Deleted {deleted_count} old prediction records"
 
 def validate_prediction_inputs(data):
     """Validate all prediction input data at once."""